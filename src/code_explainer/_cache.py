@@ -0,0 +1,55 @@
+"""Per-process memoization for repository probes.
+
+A single CLI run (especially `explain next --batch`) asks the same questions
+about the same repository over and over: the directory tree, the project
+config, the README. These decorators cache the answers for the lifetime of
+the process.
+"""
+
+import functools
+import os
+
+
+def memoize_path(func):
+    """
+    Cache `func(path, ...)` keyed by the absolute path and remaining arguments.
+
+    Use for probes whose answer is stable for the duration of a run, such as
+    directory listings.
+    """
+    cached = functools.lru_cache(maxsize=None)(func)
+
+    @functools.wraps(func)
+    def wrapper(path, *args, **kwargs):
+        return cached(os.path.abspath(path), *args, **kwargs)
+
+    wrapper.cache_clear = cached.cache_clear
+    return wrapper
+
+
+def memoize_file(func=None, *, maxsize=None):
+    """
+    Cache `func(path, ...)` keyed by absolute path, mtime and remaining arguments.
+
+    Editing the file invalidates its entry. Paths that cannot be stat'ed are
+    passed straight through and never cached. Use as `@memoize_file` or
+    `@memoize_file(maxsize=N)` to bound the cache.
+    """
+    if func is None:
+        return functools.partial(memoize_file, maxsize=maxsize)
+
+    @functools.lru_cache(maxsize=maxsize)
+    def cached(path, mtime_ns, *args, **kwargs):
+        return func(path, *args, **kwargs)
+
+    @functools.wraps(func)
+    def wrapper(path, *args, **kwargs):
+        path = os.path.abspath(path)
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+        except OSError:
+            return func(path, *args, **kwargs)
+        return cached(path, mtime_ns, *args, **kwargs)
+
+    wrapper.cache_clear = cached.cache_clear
+    return wrapper
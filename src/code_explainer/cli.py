@@ -1,13 +1,20 @@
 """Command-line interface for code explanation."""
 
 import asyncio
+import collections
+import contextlib
 import os
+import re
 import sys
+import tomllib
+from pathlib import Path
 
 import click
 
-from .explainer import check_model_available, explain
+from ._cache import memoize_path
+from .explainer import MODEL_LIMITS, check_model_available, explain
 from .git_utils import (
+    DIFF_MAX_BYTES,
     extract_symbol,
     find_related_tests,
     get_commit_log,
@@ -15,53 +22,170 @@ from .git_utils import (
     get_file_content,
     get_imports,
     get_repo_structure,
+    walk_repo,
 )
 from .prompts import (
     build_diff_prompt,
     build_file_prompt,
     build_function_prompt,
+    build_general_prompt,
     build_repo_prompt,
 )
+from .prompts.observe import build_observe_prompt
 from .observations import (
     parse_observation_requests,
     run_observations,
 )
+from .skill import get_skill_content
 from .topics import (
     add_topics,
     load_queue,
     parse_topics_from_response,
     pending_count,
     pop_at,
-    pop_next,
+    pop_batch,
+    record_output,
+    requeue,
     skip_topic,
 )
 
+# Default bound on concurrent model calls for `explain next --batch`
+DEFAULT_JOBS = 4
+
+# Project config files, in priority order
+CONFIG_FILES = [
+    "pyproject.toml",
+    "package.json",
+    "Cargo.toml",
+    "go.mod",
+    "pom.xml",
+    "build.gradle",
+    "Makefile",
+]
+_CONFIG_FILE_SET = frozenset(CONFIG_FILES)
+
+# Room in a diff prompt for everything but the diff and file list: the
+# instructions and a --max-count=20 oneline commit log
+DIFF_PROMPT_OVERHEAD = 16 * 1024
+
+# Start of the follow-up topics section in a raw model response
+_TOPICS_HEADER_RE = re.compile(rb"#+\s*Topics?\s+to\s+Explore", re.IGNORECASE)
+
+# Path separators replaced by "-" when deriving output filenames
+_PATH_SEPARATORS_TO_DASH = str.maketrans({"/": "-", "\\": "-"})
+
+# Header line naming a file's new path in a unified diff
+_DIFF_NEW_FILE_HEADER = "+++ b/"
+
 
 def _sanitize_path_for_filename(path: str) -> str:
     """Convert a file path to a safe filename (e.g., src/auth/client.py -> src-auth-client)."""
-    name = path.replace("/", "-").replace("\\", "-")
+    name = path.translate(_PATH_SEPARATORS_TO_DASH)
     # Remove extension
     if "." in name:
         name = name.rsplit(".", 1)[0]
     return name
 
 
-def _save_output(content: str, output_path: str) -> None:
-    """Save content to a file, creating directories as needed."""
-    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
-    with open(output_path, "w", encoding="utf-8") as f:
-        f.write(content)
+def _diff_max_bytes(model: str) -> int:
+    """
+    Largest diff whose prompt still fits the model's size limit.
 
+    Each changed file's "- `path`" summary line is under a third of its
+    "diff --git" and "+++ b/" headers, so the prompt is at most 4/3 of the
+    diff plus DIFF_PROMPT_OVERHEAD.
+    """
+    limit = MODEL_LIMITS.get(model)
+    if limit is None:
+        return DIFF_MAX_BYTES
+    return min(DIFF_MAX_BYTES, (limit - DIFF_PROMPT_OVERHEAD) * 3 // 4)
+
+
+def _changed_files(diff_content: str) -> list[str]:
+    """List the files changed in a unified diff."""
+    # Jump from header to header with str.find instead of visiting every line
+    header = _DIFF_NEW_FILE_HEADER
+    marker = "\n" + header
+    files = []
+    # A header on the very first line has no preceding newline
+    start = len(header) if diff_content.startswith(header) else None
+    search_from = 0
+    while True:
+        if start is None:
+            found = diff_content.find(marker, search_from)
+            if found == -1:
+                break
+            start = found + len(marker)
+        end = diff_content.find("\n", start)
+        if end == -1:
+            end = len(diff_content)
+        path = diff_content[start:end]
+        if path and path != "/dev/null":
+            files.append(path)
+        search_from = end
+        start = None
+    return files
+
+
+def _ensure_output_dir(ctx, output_dir: str) -> None:
+    """Create an output directory, at most once per command."""
+    created = ctx.obj.setdefault("created_dirs", set())
+    output_dir = os.path.abspath(output_dir)
+    if output_dir not in created:
+        os.makedirs(output_dir, exist_ok=True)
+        created.add(output_dir)
+
+
+@contextlib.contextmanager
+def _open_output(ctx, output_path: str):
+    """
+    Open an output file for streaming writes, creating its directory if needed.
 
-def _emit(ctx, text: str) -> None:
+    Content goes to a uniquely named ".part" file that replaces output_path only
+    if the block succeeds, so a failed model run never leaves a truncated result
+    and concurrent writers of the same output never share a part file.
+    """
+    _ensure_output_dir(ctx, os.path.dirname(output_path))
+    part_path = f"{output_path}.{os.getpid()}-{os.urandom(4).hex()}.part"
+    f = open(part_path, "xb")
+    try:
+        with f:
+            yield f
+    except BaseException:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(part_path)
+        raise
+    os.replace(part_path, output_path)
+
+
+def _relpath(ctx, abs_path: str, abs_repo: str) -> str:
+    """Path of abs_path relative to abs_repo, memoized for the command."""
+    cache = ctx.obj.setdefault("relpaths", {})
+    key = (abs_path, abs_repo)
+    if key not in cache:
+        cache[key] = os.path.relpath(abs_path, abs_repo)
+    return cache[key]
+
+
+def _run(ctx, coro):
+    """Run a coroutine on the event loop shared by the whole command."""
+    return ctx.obj["runner"].run(coro)
+
+
+def _emit(ctx, text: bytes) -> None:
     """Print explanation to stdout unless --quiet."""
     if not ctx.obj.get("quiet"):
         click.echo(text)
 
 
-def _enqueue_topics(response: str, source: str, output_dir: str) -> None:
+def _enqueue_topics(response: bytes, source: str, output_dir: str) -> None:
     """Parse topics from model response and add to queue."""
-    new_topics = parse_topics_from_response(response, source=source)
+    # Only the "Topics to Explore" section matters; decode from its header on
+    header = _TOPICS_HEADER_RE.search(response)
+    if header is None:
+        return
+    section = response[header.start():].decode(errors="replace")
+    new_topics = parse_topics_from_response(section, source=source)
     if new_topics:
         added = add_topics(output_dir, new_topics)
         if added:
@@ -69,27 +193,54 @@ def _enqueue_topics(response: str, source: str, output_dir: str) -> None:
             click.echo(f"Queued {added} new topic(s) ({total} pending)", err=True)
 
 
-def _find_project_config(repo_path: str) -> tuple[str | None, str | None]:
-    """Find and read the project config file (pyproject.toml, package.json, etc.)."""
-    config_files = [
-        "pyproject.toml",
-        "package.json",
-        "Cargo.toml",
-        "go.mod",
-        "pom.xml",
-        "build.gradle",
-        "Makefile",
-    ]
-    for config in config_files:
-        path = os.path.join(repo_path, config)
-        content = get_file_content(path)
-        if content is not None:
-            return config, content
+async def _enqueue_topics_async(response: bytes, source: str, output_dir: str, lock: asyncio.Lock) -> None:
+    """Queue topics from a response off the event loop, one queue writer at a time."""
+    async with lock:
+        await asyncio.to_thread(_enqueue_topics, response, source, output_dir)
+
+
+def _list_config_names(repo_path: str) -> set[str]:
+    """Names of the candidate config files present in repo_path, from one directory listing."""
+    with os.scandir(repo_path) as entries:
+        return {e.name for e in entries if e.name in _CONFIG_FILE_SET and e.is_file()}
+
+
+@memoize_path
+def _find_project_config(
+    repo_path: str,
+    lister=_list_config_names,
+    reader=get_file_content,
+) -> tuple[str | None, str | None]:
+    """
+    Find and read the project config file (pyproject.toml, package.json, etc.).
+
+    `lister` and `reader` default to the filesystem; tests pass in-memory stand-ins.
+    """
+    # One directory listing instead of trying to open every candidate
+    try:
+        names = lister(repo_path)
+    except OSError:
+        return None, None
+
+    for config in CONFIG_FILES:
+        if config in names:
+            content = reader(os.path.join(repo_path, config))
+            if content is not None:
+                return config, content
     return None, None
 
 
-def _find_entry_points(repo_path: str, config_content: str | None) -> list[str]:
-    """Identify likely entry points from config and convention."""
+def _find_entry_points(
+    repo_path: str,
+    config_content: str | None,
+    repo_files: frozenset[str] | None = None,
+) -> list[str]:
+    """
+    Identify likely entry points from config and convention.
+
+    If repo_files (relative paths from walk_repo) is given, candidates are
+    looked up there instead of stat'ing each one.
+    """
     entry_points = []
 
     # Check common entry point patterns
@@ -103,25 +254,40 @@ def _find_entry_points(repo_path: str, config_content: str | None) -> list[str]:
         "cli.py",
     ]
     for candidate in candidates:
-        if os.path.isfile(os.path.join(repo_path, candidate)):
+        if repo_files is not None:
+            if candidate in repo_files:
+                entry_points.append(candidate)
+        elif os.path.isfile(os.path.join(repo_path, candidate)):
             entry_points.append(candidate)
 
     # Parse pyproject.toml entry points
     if config_content and "[project.scripts]" in config_content:
-        in_scripts = False
-        for line in config_content.split("\n"):
-            if "[project.scripts]" in line:
-                in_scripts = True
-                continue
-            if in_scripts:
-                if line.startswith("["):
-                    break
-                if "=" in line:
-                    entry_points.append(line.strip())
+        try:
+            scripts = tomllib.loads(config_content).get("project", {}).get("scripts", {})
+        except tomllib.TOMLDecodeError:
+            entry_points.extend(_scrape_project_scripts(config_content))
+        else:
+            entry_points.extend(f'{name} = "{target}"' for name, target in scripts.items())
 
     return entry_points
 
 
+def _scrape_project_scripts(config_content: str) -> list[str]:
+    """Line-based fallback for [project.scripts] when the config isn't valid TOML."""
+    scripts = []
+    in_scripts = False
+    for line in config_content.split("\n"):
+        if "[project.scripts]" in line:
+            in_scripts = True
+            continue
+        if in_scripts:
+            if line.startswith("["):
+                break
+            if "=" in line:
+                scripts.append(line.strip())
+    return scripts
+
+
 @click.group()
 @click.version_option()
 @click.option(
@@ -136,6 +302,8 @@ def cli(ctx, quiet):
     """AI-powered code explanation tool."""
     ctx.ensure_object(dict)
     ctx.obj["quiet"] = quiet
+    # One event loop for every model call in this invocation; closed with the context
+    ctx.obj["runner"] = ctx.with_resource(asyncio.Runner())
 
 
 @cli.command()
@@ -168,6 +336,7 @@ def file(ctx, file_path, model, output_dir, repo):
         sys.exit(1)
 
     abs_path = os.path.abspath(file_path)
+    abs_repo = os.path.abspath(repo)
     content = get_file_content(abs_path)
     if content is None:
         click.echo(f"Error: Cannot read file: {file_path}", err=True)
@@ -176,9 +345,9 @@ def file(ctx, file_path, model, output_dir, repo):
     click.echo(f"Explaining {file_path}...", err=True)
 
     # Gather context
-    rel_path = os.path.relpath(abs_path, os.path.abspath(repo))
-    import_info = get_imports(abs_path, os.path.abspath(repo))
-    repo_tree = get_repo_structure(os.path.abspath(repo), max_depth=2)
+    rel_path = _relpath(ctx, abs_path, abs_repo)
+    import_info = get_imports(abs_path, abs_repo)
+    repo_tree = get_repo_structure(abs_repo, max_depth=2)
 
     # Build prompt
     prompt = build_file_prompt(
@@ -189,18 +358,17 @@ def file(ctx, file_path, model, output_dir, repo):
         repo_context=repo_tree,
     )
 
-    # Run model
+    # Run model, streaming its response into the output file
+    output_name = _sanitize_path_for_filename(rel_path) + ".md"
+    output_path = os.path.join(output_dir, output_name)
     click.echo(f"Running {model}...", err=True)
     try:
-        result = asyncio.run(explain(prompt, model))
+        with _open_output(ctx, output_path) as out:
+            result = _run(ctx, explain(prompt, model, on_chunk=out.write))
     except Exception as e:
         click.echo(f"Error: {e}", err=True)
         sys.exit(1)
 
-    # Save output
-    output_name = _sanitize_path_for_filename(rel_path) + ".md"
-    output_path = os.path.join(output_dir, output_name)
-    _save_output(result, output_path)
     click.echo(f"Saved to {output_path}", err=True)
 
     # Enqueue follow-up topics
@@ -271,7 +439,7 @@ def function(ctx, target, model, output_dir, repo):
     related_tests = find_related_tests(abs_path, abs_repo, symbol_name)
 
     # Build prompt
-    rel_path = os.path.relpath(abs_path, abs_repo)
+    rel_path = _relpath(ctx, abs_path, abs_repo)
     prompt = build_function_prompt(
         file_path=rel_path,
         symbol_name=symbol_name,
@@ -280,18 +448,17 @@ def function(ctx, target, model, output_dir, repo):
         related_tests=related_tests or None,
     )
 
-    # Run model
+    # Run model, streaming its response into the output file
+    output_name = _sanitize_path_for_filename(rel_path) + f"-{symbol_name}.md"
+    output_path = os.path.join(output_dir, output_name)
     click.echo(f"Running {model}...", err=True)
     try:
-        result = asyncio.run(explain(prompt, model))
+        with _open_output(ctx, output_path) as out:
+            result = _run(ctx, explain(prompt, model, on_chunk=out.write))
     except Exception as e:
         click.echo(f"Error: {e}", err=True)
         sys.exit(1)
 
-    # Save output
-    output_name = _sanitize_path_for_filename(rel_path) + f"-{symbol_name}.md"
-    output_path = os.path.join(output_dir, output_name)
-    _save_output(result, output_path)
     click.echo(f"Saved to {output_path}", err=True)
 
     # Enqueue follow-up topics
@@ -330,7 +497,7 @@ def repo(ctx, repo_path, model, output_dir):
     click.echo(f"Analyzing repository at {abs_repo}...", err=True)
 
     # Gather repo info
-    tree = get_repo_structure(abs_repo)
+    tree, repo_files = walk_repo(abs_repo)
 
     config_name, config_content = _find_project_config(abs_repo)
     if config_name:
@@ -345,7 +512,7 @@ def repo(ctx, repo_path, model, output_dir):
             if readme_content is not None:
                 break
 
-    entry_points = _find_entry_points(abs_repo, config_content)
+    entry_points = _find_entry_points(abs_repo, config_content, repo_files)
 
     # Build prompt
     prompt = build_repo_prompt(
@@ -355,17 +522,16 @@ def repo(ctx, repo_path, model, output_dir):
         entry_points=entry_points or None,
     )
 
-    # Run model
+    # Run model, streaming its response into the output file
+    output_path = os.path.join(output_dir, "repo-overview.md")
     click.echo(f"Running {model}...", err=True)
     try:
-        result = asyncio.run(explain(prompt, model))
+        with _open_output(ctx, output_path) as out:
+            result = _run(ctx, explain(prompt, model, on_chunk=out.write))
     except Exception as e:
         click.echo(f"Error: {e}", err=True)
         sys.exit(1)
 
-    # Save output
-    output_path = os.path.join(output_dir, "repo-overview.md")
-    _save_output(result, output_path)
     click.echo(f"Saved to {output_path}", err=True)
 
     # Enqueue follow-up topics
@@ -415,12 +581,9 @@ def diff(ctx, branch, base, repo, model, output_dir):
 
     abs_repo = os.path.abspath(repo)
 
-    # Get diff
+    # Get diff, capped so the prompt fits the model, and commit log
     try:
-        if branch:
-            diff_content = get_diff(branch, base, cwd=abs_repo)
-        else:
-            diff_content = get_diff(cwd=abs_repo)
+        diff_content, commit_log = _run(ctx, _gather_diff_context(branch, base, abs_repo, model))
     except RuntimeError as e:
         click.echo(f"Error: {e}", err=True)
         sys.exit(1)
@@ -429,18 +592,8 @@ def diff(ctx, branch, base, repo, model, output_dir):
         click.echo("No changes to explain.", err=True)
         sys.exit(0)
 
-    # Get commit log
-    commit_log = None
-    if branch:
-        commit_log = get_commit_log(branch, base, cwd=abs_repo)
-
     # Extract changed files
-    changed_files = []
-    for line in diff_content.split("\n"):
-        if line.startswith("+++ b/"):
-            path = line[6:]
-            if path != "/dev/null":
-                changed_files.append(path)
+    changed_files = _changed_files(diff_content)
 
     diff_label = branch or "staged"
     click.echo(f"Explaining {diff_label} changes ({len(changed_files)} files)...", err=True)
@@ -452,18 +605,17 @@ def diff(ctx, branch, base, repo, model, output_dir):
         changed_files_summary=changed_files or None,
     )
 
-    # Run model
+    # Run model, streaming its response into the output file
+    safe_label = diff_label.replace("/", "-")
+    output_path = os.path.join(output_dir, f"diff-{safe_label}.md")
     click.echo(f"Running {model}...", err=True)
     try:
-        result = asyncio.run(explain(prompt, model))
+        with _open_output(ctx, output_path) as out:
+            result = _run(ctx, explain(prompt, model, on_chunk=out.write))
     except Exception as e:
         click.echo(f"Error: {e}", err=True)
         sys.exit(1)
 
-    # Save output
-    safe_label = diff_label.replace("/", "-")
-    output_path = os.path.join(output_dir, f"diff-{safe_label}.md")
-    _save_output(result, output_path)
     click.echo(f"Saved to {output_path}", err=True)
 
     # Enqueue follow-up topics
@@ -550,8 +702,22 @@ def topics(output_dir, show_all):
     default=False,
     help="Skip the next topic instead of explaining it",
 )
+@click.option(
+    "--batch",
+    "-n",
+    type=click.IntRange(min=1),
+    default=1,
+    help="Number of topics to explain in this run (default: 1)",
+)
+@click.option(
+    "--jobs",
+    "-j",
+    type=click.IntRange(min=1),
+    default=DEFAULT_JOBS,
+    help=f"Maximum concurrent model calls when batching (default: {DEFAULT_JOBS})",
+)
 @click.pass_context
-def next_topic(ctx, model, output_dir, repo, skip):
+def next_topic(ctx, model, output_dir, repo, skip, batch, jobs):
     """Explain the next topic in the exploration queue."""
     if skip:
         if skip_topic(output_dir, 0):
@@ -566,32 +732,36 @@ def next_topic(ctx, model, output_dir, repo, skip):
             click.echo("Nothing to skip.")
         return
 
-    topic = pop_next(output_dir)
-    if topic is None:
+    if not pending_count(output_dir):
         click.echo("No pending topics. Run an explanation to discover topics.")
         return
 
-    click.echo(f"Next topic: [{topic.kind}] {topic.target}", err=True)
-    click.echo(f"  {topic.title}", err=True)
-    if topic.source:
-        click.echo(f"  (surfaced by {topic.source})", err=True)
-    click.echo(err=True)
+    # Checked once for the whole batch, before any topic is marked done
+    if not check_model_available(model):
+        click.echo(f"Error: Model '{model}' CLI not available", err=True)
+        sys.exit(1)
+
+    popped = pop_batch(output_dir, batch)
+
+    # Identical topics share one model call; duplicates are pointed at its output
+    unique = {}
+    for topic in popped:
+        unique.setdefault((topic.kind, topic.target), topic)
+    batch_topics = list(unique.values())
+    if len(batch_topics) < len(popped):
+        click.echo(f"Skipping {len(popped) - len(batch_topics)} duplicate topic(s).", err=True)
+
+    for topic in batch_topics:
+        click.echo(f"Next topic: [{topic.kind}] {topic.target}", err=True)
+        click.echo(f"  {topic.title}", err=True)
+        if topic.source:
+            click.echo(f"  (surfaced by {topic.source})", err=True)
+        click.echo(err=True)
 
     abs_repo = os.path.abspath(repo)
 
-    # Dispatch based on topic kind
-    if topic.kind == "file":
-        _run_file_topic(ctx, topic, model, output_dir, abs_repo)
-    elif topic.kind == "function":
-        _run_function_topic(ctx, topic, model, output_dir, abs_repo)
-    elif topic.kind == "repo":
-        _run_repo_topic(ctx, topic, model, output_dir, abs_repo)
-    elif topic.kind == "diff":
-        _run_diff_topic(ctx, topic, model, output_dir, abs_repo)
-    elif topic.kind == "general":
-        _run_general_topic(ctx, topic, model, output_dir, abs_repo)
-    else:
-        click.echo(f"Unknown topic kind: {topic.kind}", err=True)
+    ok = _run(ctx, _run_batch(ctx, batch_topics, model, output_dir, abs_repo, jobs))
+    if not ok:
         sys.exit(1)
 
     remaining = pending_count(output_dir)
@@ -601,28 +771,101 @@ def next_topic(ctx, model, output_dir, repo, skip):
         click.echo("\nNo more topics. Exploration complete.", err=True)
 
 
-def _run_file_topic(ctx, topic, model, output_dir, repo_path):
-    """Handle a file exploration topic."""
+async def _run_batch(ctx, batch_topics, model, output_dir, repo_path, jobs) -> bool:
+    """
+    Explain topics concurrently, with at most `jobs` model calls in flight.
+
+    Returns False if any topic failed. Topics that timed out or whose model
+    run failed go back to pending.
+    """
+    sem = asyncio.Semaphore(jobs)
+    # Topics that map to the same output file (every repo topic, a.py and a.js) take turns
+    output_locks: collections.defaultdict[str, asyncio.Lock] = collections.defaultdict(asyncio.Lock)
+    # Follow-up topics are queued in the background; the lock serializes queue file writes
+    queue_lock = asyncio.Lock()
+    enqueue_tasks: list[asyncio.Task] = []
+
+    try:
+        results = await asyncio.gather(
+            *(
+                _run_topic(ctx, topic, model, output_dir, repo_path, sem, output_locks, queue_lock, enqueue_tasks)
+                for topic in batch_topics
+            ),
+            return_exceptions=True,
+        )
+    finally:
+        enqueue_results = await asyncio.gather(*enqueue_tasks, return_exceptions=True)
+
+    ok = True
+    for topic, result in zip(batch_topics, results):
+        if isinstance(result, Exception):
+            click.echo(f"Error explaining {topic.target}: {result}", err=True)
+            # A timeout or failed model run may succeed next time; any other
+            # error would fail again, so the topic stays done
+            if isinstance(result, (TimeoutError, RuntimeError)):
+                requeue(output_dir, topic.kind, topic.target)
+            ok = False
+        elif result:
+            record_output(output_dir, topic.kind, topic.target, result)
+    for result in enqueue_results:
+        if isinstance(result, Exception):
+            click.echo(f"Error queueing topics: {result}", err=True)
+            ok = False
+    return ok
+
+
+async def _run_topic(
+    ctx, topic, model, output_dir, repo_path, sem, output_locks, queue_lock, enqueue_tasks,
+) -> str | None:
+    """
+    Explain a single topic: build its prompt, run the model, save and enqueue.
+
+    Returns the output path, or None if the topic was skipped.
+    """
+    async with sem:
+        if topic.kind not in _TOPIC_BUILDERS:
+            raise ValueError(f"Unknown topic kind: {topic.kind}")
+        job = await _TOPIC_BUILDERS[topic.kind](ctx, topic, model, output_dir, repo_path)
+
+        if job is None:
+            return None
+        prompt, output_path, source = job
+
+        click.echo(f"Running {model} for {topic.target}...", err=True)
+        async with output_locks[output_path]:
+            with _open_output(ctx, output_path) as out:
+                result = await explain(prompt, model, on_chunk=out.write)
+
+    click.echo(f"Saved to {output_path}", err=True)
+
+    enqueue_tasks.append(asyncio.create_task(
+        _enqueue_topics_async(result, source=source, output_dir=output_dir, lock=queue_lock)
+    ))
+    _emit(ctx, result)
+    return output_path
+
+
+async def _build_file_prompt_and_paths(ctx, topic, model, output_dir, repo_path) -> tuple[str, str, str] | None:
+    """Build the prompt for a file exploration topic."""
     # Target is a file path, possibly relative to repo
     file_path = topic.target
     abs_path = os.path.join(repo_path, file_path) if not os.path.isabs(file_path) else file_path
 
     if not os.path.isfile(abs_path):
         click.echo(f"File not found: {file_path} (skipping)", err=True)
-        return
+        return None
 
-    if not check_model_available(model):
-        click.echo(f"Error: Model '{model}' CLI not available", err=True)
-        sys.exit(1)
-
-    content = get_file_content(abs_path)
+    # Independent file/AST probes — run them concurrently off the event loop
+    content, import_info, repo_tree = await asyncio.gather(
+        asyncio.to_thread(get_file_content, abs_path),
+        asyncio.to_thread(get_imports, abs_path, repo_path),
+        asyncio.to_thread(get_repo_structure, repo_path, max_depth=2),
+    )
     if content is None:
         click.echo(f"Cannot read file: {file_path}", err=True)
-        return
+        return None
 
-    rel_path = os.path.relpath(abs_path, repo_path)
-    import_info = get_imports(abs_path, repo_path)
-    repo_tree = get_repo_structure(repo_path, max_depth=2)
+    rel_path = _relpath(ctx, abs_path, repo_path)
 
     prompt = build_file_prompt(
         file_path=rel_path,
@@ -632,48 +875,36 @@ def _run_file_topic(ctx, topic, model, output_dir, repo_path):
         repo_context=repo_tree,
     )
 
-    click.echo(f"Running {model}...", err=True)
-    try:
-        result = asyncio.run(explain(prompt, model))
-    except Exception as e:
-        click.echo(f"Error: {e}", err=True)
-        sys.exit(1)
-
     output_name = _sanitize_path_for_filename(rel_path) + ".md"
     output_path = os.path.join(output_dir, output_name)
-    _save_output(result, output_path)
-    click.echo(f"Saved to {output_path}", err=True)
-
-    _enqueue_topics(result, source=f"file:{rel_path}", output_dir=output_dir)
-    _emit(ctx, result)
+    return prompt, output_path, f"file:{rel_path}"
 
 
-def _run_function_topic(ctx, topic, model, output_dir, repo_path):
-    """Handle a function exploration topic."""
+async def _build_function_prompt_and_paths(ctx, topic, model, output_dir, repo_path) -> tuple[str, str, str] | None:
+    """Build the prompt for a function exploration topic."""
     # Target should be file:symbol
     if ":" not in topic.target:
         click.echo(f"Function topic target must be file:symbol, got: {topic.target}", err=True)
-        return
+        return None
 
     file_path, symbol_name = topic.target.rsplit(":", 1)
     abs_path = os.path.join(repo_path, file_path) if not os.path.isabs(file_path) else file_path
 
     if not os.path.isfile(abs_path):
         click.echo(f"File not found: {file_path} (skipping)", err=True)
-        return
-
-    if not check_model_available(model):
-        click.echo(f"Error: Model '{model}' CLI not available", err=True)
-        sys.exit(1)
+        return None
 
-    symbol_source = extract_symbol(abs_path, symbol_name)
+    # Independent file/AST probes — run them concurrently off the event loop
+    symbol_source, full_content, related_tests = await asyncio.gather(
+        asyncio.to_thread(extract_symbol, abs_path, symbol_name),
+        asyncio.to_thread(get_file_content, abs_path),
+        asyncio.to_thread(find_related_tests, abs_path, repo_path, symbol_name),
+    )
     if symbol_source is None:
         click.echo(f"Symbol '{symbol_name}' not found in {file_path} (skipping)", err=True)
-        return
+        return None
 
-    full_content = get_file_content(abs_path)
-    related_tests = find_related_tests(abs_path, repo_path, symbol_name)
-    rel_path = os.path.relpath(abs_path, repo_path)
+    rel_path = _relpath(ctx, abs_path, repo_path)
 
     prompt = build_function_prompt(
         file_path=rel_path,
@@ -683,38 +914,26 @@ def _run_function_topic(ctx, topic, model, output_dir, repo_path):
         related_tests=related_tests or None,
     )
 
-    click.echo(f"Running {model}...", err=True)
-    try:
-        result = asyncio.run(explain(prompt, model))
-    except Exception as e:
-        click.echo(f"Error: {e}", err=True)
-        sys.exit(1)
-
     output_name = _sanitize_path_for_filename(rel_path) + f"-{symbol_name}.md"
     output_path = os.path.join(output_dir, output_name)
-    _save_output(result, output_path)
-    click.echo(f"Saved to {output_path}", err=True)
-
-    _enqueue_topics(result, source=f"function:{rel_path}:{symbol_name}", output_dir=output_dir)
-    _emit(ctx, result)
+    return prompt, output_path, f"function:{rel_path}:{symbol_name}"
 
 
-def _run_repo_topic(ctx, topic, model, output_dir, repo_path):
-    """Handle a repo exploration topic."""
+async def _build_repo_prompt_and_paths(ctx, topic, model, output_dir, repo_path) -> tuple[str, str, str] | None:
+    """Build the prompt for a repo exploration topic."""
     # For repo topics, target might be a subdirectory or the whole repo
     target_path = os.path.join(repo_path, topic.target) if topic.target != "." else repo_path
 
     if not os.path.isdir(target_path):
         target_path = repo_path
 
-    if not check_model_available(model):
-        click.echo(f"Error: Model '{model}' CLI not available", err=True)
-        sys.exit(1)
-
-    tree = get_repo_structure(target_path)
-    config_name, config_content = _find_project_config(target_path)
-    readme_content = get_file_content(os.path.join(target_path, "README.md"))
-    entry_points = _find_entry_points(target_path, config_content)
+    # Independent filesystem probes — run them concurrently off the event loop
+    (tree, repo_files), (config_name, config_content), readme_content = await asyncio.gather(
+        asyncio.to_thread(walk_repo, target_path),
+        asyncio.to_thread(_find_project_config, target_path),
+        asyncio.to_thread(get_file_content, os.path.join(target_path, "README.md")),
+    )
+    entry_points = await asyncio.to_thread(_find_entry_points, target_path, config_content, repo_files)
 
     prompt = build_repo_prompt(
         tree=tree,
@@ -723,45 +942,40 @@ def _run_repo_topic(ctx, topic, model, output_dir, repo_path):
         entry_points=entry_points or None,
     )
 
-    click.echo(f"Running {model}...", err=True)
-    try:
-        result = asyncio.run(explain(prompt, model))
-    except Exception as e:
-        click.echo(f"Error: {e}", err=True)
-        sys.exit(1)
-
     output_path = os.path.join(output_dir, "repo-overview.md")
-    _save_output(result, output_path)
-    click.echo(f"Saved to {output_path}", err=True)
+    return prompt, output_path, "repo-overview"
 
-    _enqueue_topics(result, source="repo-overview", output_dir=output_dir)
-    _emit(ctx, result)
 
+async def _gather_diff_context(ref, base, repo_path, model) -> tuple[str, str | None]:
+    """
+    Fetch a diff, capped to fit the model's prompt limit, and its commit log concurrently.
 
-def _run_diff_topic(ctx, topic, model, output_dir, repo_path):
-    """Handle a diff exploration topic."""
-    if not check_model_available(model):
-        click.echo(f"Error: Model '{model}' CLI not available", err=True)
-        sys.exit(1)
+    Returns (diff, commit log); there is no log for staged changes.
+    Raises RuntimeError if git can't produce the diff.
+    """
+    max_bytes = _diff_max_bytes(model)
+    if ref is None:
+        return await asyncio.to_thread(get_diff, cwd=repo_path, max_bytes=max_bytes), None
+    diff_content, commit_log = await asyncio.gather(
+        asyncio.to_thread(get_diff, ref, base, cwd=repo_path, max_bytes=max_bytes),
+        asyncio.to_thread(get_commit_log, ref, base, cwd=repo_path),
+    )
+    return diff_content, commit_log
 
+
+async def _build_diff_prompt_and_paths(ctx, topic, model, output_dir, repo_path) -> tuple[str, str, str] | None:
+    """Build the prompt for a diff exploration topic."""
     try:
-        diff_content = get_diff(topic.target, cwd=repo_path)
+        diff_content, commit_log = await _gather_diff_context(topic.target, None, repo_path, model)
     except RuntimeError as e:
         click.echo(f"Error getting diff: {e}", err=True)
-        return
+        return None
 
     if not diff_content.strip():
         click.echo("No changes to explain.", err=True)
-        return
+        return None
 
-    commit_log = get_commit_log(topic.target, cwd=repo_path)
-
-    changed_files = []
-    for line in diff_content.split("\n"):
-        if line.startswith("+++ b/"):
-            path = line[6:]
-            if path != "/dev/null":
-                changed_files.append(path)
+    changed_files = _changed_files(diff_content)
 
     prompt = build_diff_prompt(
         diff_content=diff_content,
@@ -769,43 +983,21 @@ def _run_diff_topic(ctx, topic, model, output_dir, repo_path):
         changed_files_summary=changed_files or None,
     )
 
-    click.echo(f"Running {model}...", err=True)
-    try:
-        result = asyncio.run(explain(prompt, model))
-    except Exception as e:
-        click.echo(f"Error: {e}", err=True)
-        sys.exit(1)
-
     safe_label = topic.target.replace("/", "-")
     output_path = os.path.join(output_dir, f"diff-{safe_label}.md")
-    _save_output(result, output_path)
-    click.echo(f"Saved to {output_path}", err=True)
-
-    _enqueue_topics(result, source=f"diff:{topic.target}", output_dir=output_dir)
-    _emit(ctx, result)
-
-
-def _run_general_topic(ctx, topic, model, output_dir, repo_path):
-    """Handle a general exploration topic using observe-then-explain."""
-    if not check_model_available(model):
-        click.echo(f"Error: Model '{model}' CLI not available", err=True)
-        sys.exit(1)
+    return prompt, output_path, f"diff:{topic.target}"
 
-    from .prompts import TOPICS_INSTRUCTIONS
-    from .prompts.observe import build_observe_prompt
 
+async def _build_general_prompt_and_paths(ctx, topic, model, output_dir, repo_path) -> tuple[str, str, str]:
+    """Build the prompt for a general exploration topic using observe-then-explain."""
     # Phase 1: Observe — ask the model what it needs to see
-    tree = get_repo_structure(repo_path, max_depth=2)
+    tree = await asyncio.to_thread(get_repo_structure, repo_path, max_depth=2)
     observe_prompt = build_observe_prompt(question=topic.title, tree=tree)
 
     click.echo(f"Gathering observations with {model}...", err=True)
-    try:
-        observe_response = asyncio.run(explain(observe_prompt, model))
-    except Exception as e:
-        click.echo(f"Error during observe: {e}", err=True)
-        sys.exit(1)
+    observe_response = await explain(observe_prompt, model)
 
-    requested_obs = parse_observation_requests(observe_response)
+    requested_obs = parse_observation_requests(observe_response.decode(errors="replace"))
 
     # Phase 2: Run observations
     obs_results = {}
@@ -813,7 +1005,7 @@ def _run_general_topic(ctx, topic, model, output_dir, repo_path):
         click.echo(f"Running {len(requested_obs)} observation(s):", err=True)
         for obs in requested_obs:
             click.echo(f"  - {obs.get('tool')}: {obs.get('name')}", err=True)
-        obs_results = asyncio.run(run_observations(requested_obs, repo_path))
+        obs_results = await run_observations(requested_obs, repo_path)
 
         failed = [n for n, r in obs_results.items() if isinstance(r, dict) and "error" in r]
         if failed:
@@ -822,53 +1014,21 @@ def _run_general_topic(ctx, topic, model, output_dir, repo_path):
         click.echo("No observations requested.", err=True)
 
     # Phase 3: Explain — now with targeted context
-    import json
-
-    explain_sections = [
-        "You are a senior software engineer explaining a codebase to a new team member.",
-        f"The reader wants to understand: **{topic.title}**",
-        "",
-    ]
-
-    if obs_results:
-        explain_sections.extend([
-            "## Observations",
-            "",
-            "The following information was gathered from the codebase:",
-            "",
-            "```json",
-            json.dumps(obs_results, indent=2, default=str),
-            "```",
-            "",
-        ])
-
-    explain_sections.extend([
-        "## Instructions",
-        "",
-        f"Explain **{topic.title}** based on the observations above.",
-        "Reference specific files, functions, and line numbers from the observations.",
-        "If the observations are insufficient, say what's missing.",
-        "",
-        "Format your response as markdown.",
-        TOPICS_INSTRUCTIONS,
-    ])
-
-    prompt = "\n".join(explain_sections)
-
-    click.echo(f"Explaining with {model}...", err=True)
-    try:
-        result = asyncio.run(explain(prompt, model))
-    except Exception as e:
-        click.echo(f"Error: {e}", err=True)
-        sys.exit(1)
+    prompt = build_general_prompt(question=topic.title, observations=obs_results)
 
     safe_label = _sanitize_path_for_filename(topic.target)
     output_path = os.path.join(output_dir, f"topic-{safe_label}.md")
-    _save_output(result, output_path)
-    click.echo(f"Saved to {output_path}", err=True)
+    return prompt, output_path, f"general:{topic.target}"
 
-    _enqueue_topics(result, source=f"general:{topic.target}", output_dir=output_dir)
-    _emit(ctx, result)
+
+# Prompt builder for each topic kind
+_TOPIC_BUILDERS = {
+    "file": _build_file_prompt_and_paths,
+    "function": _build_function_prompt_and_paths,
+    "repo": _build_repo_prompt_and_paths,
+    "diff": _build_diff_prompt_and_paths,
+    "general": _build_general_prompt_and_paths,
+}
 
 
 @cli.command()
@@ -914,6 +1074,10 @@ def pick(ctx, index, model, output_dir, repo):
         click.echo(f"\nRun `explain pick <index>` to explain a topic.")
         return
 
+    if not check_model_available(model):
+        click.echo(f"Error: Model '{model}' CLI not available", err=True)
+        sys.exit(1)
+
     topic = pop_at(output_dir, index)
     if topic is None:
         click.echo(f"Invalid index: {index} (0-{len(pending) - 1} available)", err=True)
@@ -925,18 +1089,8 @@ def pick(ctx, index, model, output_dir, repo):
 
     abs_repo = os.path.abspath(repo)
 
-    if topic.kind == "file":
-        _run_file_topic(ctx, topic, model, output_dir, abs_repo)
-    elif topic.kind == "function":
-        _run_function_topic(ctx, topic, model, output_dir, abs_repo)
-    elif topic.kind == "repo":
-        _run_repo_topic(ctx, topic, model, output_dir, abs_repo)
-    elif topic.kind == "diff":
-        _run_diff_topic(ctx, topic, model, output_dir, abs_repo)
-    elif topic.kind == "general":
-        _run_general_topic(ctx, topic, model, output_dir, abs_repo)
-    else:
-        click.echo(f"Unknown topic kind: {topic.kind}", err=True)
+    ok = _run(ctx, _run_batch(ctx, [topic], model, output_dir, abs_repo, jobs=1))
+    if not ok:
         sys.exit(1)
 
     remaining = pending_count(output_dir)
@@ -955,10 +1109,6 @@ def pick(ctx, index, model, output_dir, repo):
 )
 def install_skill(skill_dir):
     """Install the code-explainer skill file for Claude Code."""
-    from pathlib import Path
-
-    from .skill import get_skill_content
-
     if skill_dir:
         target_dir = Path(skill_dir)
     else:
@@ -1,8 +1,14 @@
 """Model invocation for code explanation."""
 
 import asyncio
+import contextlib
+import functools
+import hashlib
 import os
 import shutil
+import tempfile
+import time
+from collections.abc import Callable
 
 # Model CLI commands - extend this dict to add new models
 # Note: gemini requires empty string after -p to read prompt from stdin
@@ -11,37 +17,151 @@ MODEL_COMMANDS: dict[str, list[str]] = {
     "gemini": ["gemini", "-p", ""],
 }
 
+# Approximate prompt size limits in bytes (~4 bytes per token of context window).
+# Prompts over the limit fail fast instead of spawning a model that will reject them.
+MODEL_LIMITS: dict[str, int] = {
+    "claude": 800_000,
+    "gemini": 4_000_000,
+}
+
 DEFAULT_TIMEOUT = 300
 
+# Read size when streaming model output
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Response cache - set CODE_EXPLAINER_CACHE=1 to reuse responses to identical prompts
+CACHE_ENV_VAR = "CODE_EXPLAINER_CACHE"
+CACHE_MAX_AGE = 7 * 24 * 60 * 60
+
 
+@functools.lru_cache(maxsize=None)
 def check_model_available(model: str) -> bool:
-    """Check if a model's CLI is available."""
+    """Check if a model's CLI is available. The answer is cached for the process."""
     if model not in MODEL_COMMANDS:
         return False
     cmd = MODEL_COMMANDS[model][0]
     return shutil.which(cmd) is not None
 
 
-async def explain(prompt: str, model: str = "claude", timeout: int = DEFAULT_TIMEOUT) -> str:
+def _cache_path(prompt: str, model: str) -> str | None:
+    """Cache file for a prompt/model pair, or None if caching is disabled."""
+    if os.environ.get(CACHE_ENV_VAR) != "1":
+        return None
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    key = hashlib.sha256(f"{model}\0{prompt}".encode()).hexdigest()
+    return os.path.join(cache_home, "code-explainer", f"{key}.md")
+
+
+def _read_cache(path: str) -> bytes | None:
+    """Return a cached response if present and not older than CACHE_MAX_AGE."""
+    try:
+        if time.time() - os.path.getmtime(path) > CACHE_MAX_AGE:
+            return None
+        with open(path, "rb") as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def _write_cache(path: str, content: bytes) -> None:
+    """Atomically store a response. Failures are ignored; the cache is best-effort."""
+    cache_dir = os.path.dirname(path)
+    with contextlib.suppress(OSError):
+        os.makedirs(cache_dir, exist_ok=True)
+        with tempfile.NamedTemporaryFile("wb", dir=cache_dir, suffix=".tmp", delete=False) as f:
+            f.write(content)
+        try:
+            os.replace(f.name, path)
+        except OSError:
+            os.remove(f.name)
+            raise
+
+
+async def _stream_output(
+    proc: asyncio.subprocess.Process,
+    prompt: str,
+    on_chunk: Callable[[bytes], None] | None,
+) -> tuple[bytes, bytes]:
+    """Feed the prompt to proc and collect stdout chunk by chunk as it arrives."""
+
+    async def _write_prompt():
+        try:
+            proc.stdin.write(prompt.encode())
+            await proc.stdin.drain()
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # process exited early; its return code reports the failure
+        finally:
+            proc.stdin.close()
+
+    async def _read_stdout():
+        chunks = []
+        while chunk := await proc.stdout.read(STREAM_CHUNK_SIZE):
+            chunks.append(chunk)
+            if on_chunk is not None:
+                on_chunk(chunk)
+        return b"".join(chunks)
+
+    _, stdout, stderr = await asyncio.gather(_write_prompt(), _read_stdout(), proc.stderr.read())
+    await proc.wait()
+    return stdout, stderr
+
+
+async def explain(
+    prompt: str,
+    model: str = "claude",
+    timeout: int = DEFAULT_TIMEOUT,
+    on_chunk: Callable[[bytes], None] | None = None,
+) -> bytes:
     """
     Invoke model via CLI, piping prompt through stdin.
 
+    With CODE_EXPLAINER_CACHE=1, responses are cached under
+    ~/.cache/code-explainer/ keyed by a hash of model and prompt.
+
     Args:
         prompt: Full prompt text to send
         model: Model name (must be in MODEL_COMMANDS)
         timeout: Timeout in seconds
+        on_chunk: Called with each raw chunk of output as it arrives
 
     Returns:
-        Model's response text
+        Model's response as raw UTF-8 bytes; decode only where text is needed
 
     Raises:
-        ValueError: If model not supported
+        ValueError: If model not supported or prompt exceeds MODEL_LIMITS
         TimeoutError: If model doesn't respond in time
         RuntimeError: If model invocation fails
     """
     if model not in MODEL_COMMANDS:
         raise ValueError(f"Unknown model: {model}. Available: {list(MODEL_COMMANDS.keys())}")
 
+    limit = MODEL_LIMITS.get(model)
+    prompt_size = len(prompt.encode())
+    if limit is not None and prompt_size > limit:
+        raise ValueError(f"Prompt is {prompt_size} bytes, over the {limit}-byte limit for {model}")
+
+    cache_path = _cache_path(prompt, model)
+    if cache_path is not None:
+        cached = _read_cache(cache_path)
+        if cached is not None:
+            if on_chunk is not None:
+                on_chunk(cached)
+            return cached
+
+    result = await _explain_once(prompt, model, timeout, on_chunk)
+
+    if cache_path is not None:
+        _write_cache(cache_path, result)
+    return result
+
+
+async def _explain_once(
+    prompt: str,
+    model: str,
+    timeout: int,
+    on_chunk: Callable[[bytes], None] | None,
+) -> bytes:
+    """Run a one-shot model process for a single prompt."""
     cmd = MODEL_COMMANDS[model]
 
     # Remove CLAUDECODE env var to allow nested claude invocation
@@ -57,7 +177,7 @@ async def explain(prompt: str, model: str = "claude", timeout: int = DEFAULT_TIM
 
     try:
         stdout, stderr = await asyncio.wait_for(
-            proc.communicate(prompt.encode()),
+            _stream_output(proc, prompt, on_chunk),
             timeout=timeout,
         )
     except TimeoutError:
@@ -67,4 +187,4 @@ async def explain(prompt: str, model: str = "claude", timeout: int = DEFAULT_TIM
     if proc.returncode != 0:
         raise RuntimeError(f"Model {model} failed: {stderr.decode()}")
 
-    return stdout.decode()
+    return stdout
@@ -1,8 +1,150 @@
 """Git utilities for code explanation."""
 
+import ast
+import functools
 import os
+import re
 import subprocess
-from pathlib import Path
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from ._cache import memoize_file, memoize_path
+
+# Directories never worth descending into when scanning a repository
+_SKIP_DIRS = frozenset({
+    ".git", ".hg", ".svn", "node_modules", "__pycache__",
+    ".tox", ".venv", "venv", ".env", "env", ".eggs",
+    "dist", "build", ".mypy_cache", ".pytest_cache",
+    ".ruff_cache", "htmlcov", ".coverage", "*.egg-info",
+})
+
+
+# A whole import line, at any indentation
+_IMPORT_LINE_RE = re.compile(r"^[ \t]*(?:import|from)[ \t].*$", re.MULTILINE)
+
+# Build artifacts left out of directory trees
+_SKIP_SUFFIXES = frozenset({".pyc", ".pyo", ".so", ".o", ".a", ".dylib"})
+
+
+def _scandir_recursive(path: str, skip_dirs=_SKIP_DIRS):
+    """
+    Yield a DirEntry for every file under `path`.
+
+    Symlinks are skipped and directories named in `skip_dirs` are pruned.
+    DirEntry caches its type from the directory read, so no extra stat()
+    calls are made per file.
+    """
+    try:
+        it = os.scandir(path)
+    except OSError:
+        return
+    with it:
+        for entry in it:
+            if entry.is_symlink():
+                continue
+            if entry.is_dir(follow_symlinks=False):
+                if entry.name not in skip_dirs:
+                    yield from _scandir_recursive(entry.path, skip_dirs)
+            else:
+                yield entry
+
+
+# Below this many files a thread pool costs more than it saves
+PARALLEL_SCAN_THRESHOLD = 50
+
+
+def _map_files(func, items: list) -> list:
+    """
+    Apply `func` to each item, in order.
+
+    Large scans run in a thread pool so file reads overlap; the GIL is
+    released while waiting on I/O.
+    """
+    if len(items) <= PARALLEL_SCAN_THRESHOLD:
+        return [func(item) for item in items]
+    workers = min(32, (os.cpu_count() or 1) * 4)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(func, items))
+
+
+@memoize_path
+def _list_tracked_files(repo_path: str) -> tuple[str, ...] | None:
+    """
+    List the files git knows about under `repo_path`, relative to it.
+
+    Untracked files are included unless ignored. Returns None outside a git
+    work tree, if git isn't available, or if git lists nothing, as for a
+    directory that is empty or wholly ignored (say vendor/lib), so callers
+    walk the tree instead.
+    """
+    try:
+        result = subprocess.run(
+            ["git", "-C", repo_path, "ls-files", "-z", "--cached", "--others", "--exclude-standard"],
+            capture_output=True,
+        )
+    except OSError:
+        return None
+    if result.returncode != 0:
+        return None
+    return tuple(os.fsdecode(p) for p in result.stdout.split(b"\0") if p) or None
+
+
+def _iter_repo_files(repo_path: str):
+    """
+    Yield (relative path, absolute path) for every file in a repository.
+
+    Uses git's file list when available, so ignored files are never visited;
+    otherwise falls back to walking the directory tree.
+    """
+    root = os.path.abspath(repo_path)
+    tracked = _list_tracked_files(root)
+    if tracked is None:
+        for entry in _scandir_recursive(root):
+            yield os.path.relpath(entry.path, root), entry.path
+        return
+    for rel in tracked:
+        if not _SKIP_DIRS.isdisjoint(rel.split("/")[:-1]):
+            continue
+        yield rel, os.path.join(root, rel)
+
+
+# Diffs beyond this size are cut off when the caller doesn't pass a tighter,
+# model-specific cap; the prompt has to fit the model anyway
+DIFF_MAX_BYTES = 4 * 1024 * 1024
+
+
+def _diff_commands(args: list[str], ref: str | None, base: str | None) -> list[list[str]]:
+    """Build the `git diff` command lines to try in order for ref against base."""
+    if ref is None:
+        return [["git", "diff", "--staged", *args]]
+    # Let git reject a missing origin/main rather than probing with rev-parse first
+    bases = [base] if base is not None else ["origin/main", "main"]
+    return [["git", "diff", *args, f"{b}...{ref}"] for b in bases]
+
+
+def _run_capped(cmd: list[str], cwd: str | None, max_bytes: int) -> tuple[int, bytes, bytes, bool]:
+    """
+    Run a command, reading at most `max_bytes` of its stdout.
+
+    Returns (returncode, stdout, stderr, truncated). A truncated run is killed
+    once the limit is reached and reports returncode 0.
+    """
+    # stderr goes to a file: an undrained pipe would block the command, and
+    # with it our stdout read, once it filled up
+    with tempfile.TemporaryFile() as err, subprocess.Popen(
+        cmd, stdout=subprocess.PIPE, stderr=err, cwd=cwd,
+    ) as proc:
+        stdout = proc.stdout.read(max_bytes + 1)
+        truncated = len(stdout) > max_bytes
+        if truncated:
+            proc.kill()
+        proc.communicate()
+        err.seek(0)
+        stderr = err.read()
+    if truncated:
+        return 0, stdout[:max_bytes], stderr, True
+    return proc.returncode, stdout, stderr, False
 
 
 def get_diff(
@@ -10,6 +152,7 @@ def get_diff(
     base: str | None = None,
     cwd: str | None = None,
     context_lines: int = 10,
+    max_bytes: int = DIFF_MAX_BYTES,
 ) -> str:
     """
     Get git diff.
@@ -19,41 +162,75 @@ def get_diff(
         base: Base branch to diff against (default: main)
         cwd: Working directory
         context_lines: Number of context lines
+        max_bytes: Read at most this much of the diff
 
     Returns:
-        Git diff output
+        Git diff output, ending in a truncation note if it was cut off
 
     Raises:
         RuntimeError: If git command fails
     """
-    context_arg = f"-U{context_lines}"
+    for cmd in _diff_commands([f"-U{context_lines}"], ref, base):
+        returncode, stdout, stderr, truncated = _run_capped(cmd, cwd, max_bytes)
+        if returncode == 0:
+            break
 
-    if ref is None:
-        cmd = ["git", "diff", "--staged", context_arg]
-    else:
-        if base is None:
-            check = subprocess.run(
-                ["git", "rev-parse", "--verify", "origin/main"],
-                capture_output=True,
-                cwd=cwd,
-            )
-            base = "origin/main" if check.returncode == 0 else "main"
-        cmd = ["git", "diff", context_arg, f"{base}...{ref}"]
+    if returncode != 0:
+        raise RuntimeError(f"Git diff failed: {stderr.decode(errors='replace')}")
 
-    result = subprocess.run(cmd, capture_output=True, text=True, cwd=cwd)
+    if truncated:
+        # Cut back to the last complete line
+        stdout = stdout[:stdout.rfind(b"\n") + 1]
+        return stdout.decode(errors="replace") + f"\n[diff truncated at {max_bytes} bytes]\n"
+    return stdout.decode(errors="replace")
 
-    if result.returncode != 0:
-        raise RuntimeError(f"Git diff failed: {result.stderr}")
 
-    return result.stdout
+def get_diff_stat(
+    ref: str | None = None,
+    base: str | None = None,
+    cwd: str | None = None,
+) -> str:
+    """
+    Get a `git diff --stat` summary, for callers that don't need the full diff.
 
+    Takes the same ref and base as get_diff.
 
+    Raises:
+        RuntimeError: If git command fails
+    """
+    for cmd in _diff_commands(["--stat"], ref, base):
+        result = subprocess.run(cmd, capture_output=True, text=True, cwd=cwd)
+        if result.returncode == 0:
+            return result.stdout
+    raise RuntimeError(f"Git diff failed: {result.stderr}")
+
+
+# Bounded so a scan over a huge repository can't hold every file in memory
+FILE_CACHE_SIZE = 4096
+
+
+@memoize_file(maxsize=FILE_CACHE_SIZE)
 def get_file_content(path: str) -> str | None:
-    """Read file content, returning None if not found."""
+    """
+    Read file content, returning None if not found or unreadable.
+
+    Bytes that aren't valid UTF-8 are replaced rather than failing the read.
+    """
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except (FileNotFoundError, IsADirectoryError, PermissionError):
+        return None
+    return data.decode("utf-8", errors="replace")
+
+
+@memoize_file(maxsize=FILE_CACHE_SIZE)
+def _get_file_bytes(path: str) -> bytes | None:
+    """Read raw file bytes, returning None if not found or unreadable."""
     try:
-        with open(path, encoding="utf-8") as f:
+        with open(path, "rb") as f:
             return f.read()
-    except (FileNotFoundError, UnicodeDecodeError):
+    except (FileNotFoundError, IsADirectoryError, PermissionError):
         return None
 
 
@@ -68,52 +245,90 @@ def get_repo_structure(repo_path: str, max_depth: int = 4) -> str:
     Returns:
         Formatted directory tree string
     """
-    skip_dirs = {
-        ".git", ".hg", ".svn", "node_modules", "__pycache__",
-        ".tox", ".venv", "venv", ".env", "env", ".eggs",
-        "dist", "build", ".mypy_cache", ".pytest_cache",
-        ".ruff_cache", "htmlcov", ".coverage", "*.egg-info",
-    }
-    skip_suffixes = {".pyc", ".pyo", ".so", ".o", ".a", ".dylib"}
-
-    lines = []
-    root = Path(repo_path)
-
-    def _walk(dir_path: Path, prefix: str, depth: int):
-        if depth > max_depth:
-            return
-
-        try:
-            entries = sorted(dir_path.iterdir(), key=lambda e: (not e.is_dir(), e.name))
-        except PermissionError:
-            return
-
-        # Filter entries
-        filtered = []
-        for entry in entries:
-            if entry.name.startswith(".") and entry.name in skip_dirs:
-                continue
-            if entry.is_dir() and entry.name in skip_dirs:
-                continue
-            if entry.is_dir() and entry.name.endswith(".egg-info"):
-                continue
-            if entry.is_file() and entry.suffix in skip_suffixes:
-                continue
-            filtered.append(entry)
+    return walk_repo(repo_path, max_depth)[0]
+
+
+def _nest_paths(paths, max_depth: int) -> dict:
+    """
+    Arrange relative file paths into a nested dict, applying the tree filters.
 
-        for i, entry in enumerate(filtered):
-            is_last = i == len(filtered) - 1
+    Directories map to dicts of their children and files map to None. Paths
+    deeper than `max_depth` only contribute their directories.
+    """
+    tree: dict = {}
+    for path in paths:
+        parts = path.split("/")
+        dirs, name = parts[:-1], parts[-1]
+        if any(d in _SKIP_DIRS or d.endswith(".egg-info") for d in dirs):
+            continue
+        if (name.startswith(".") and name in _SKIP_DIRS) or os.path.splitext(name)[1] in _SKIP_SUFFIXES:
+            continue
+        node = tree
+        for d in dirs[:max_depth]:
+            node = node.setdefault(d, {})
+        if len(parts) <= max_depth:
+            node[name] = None
+    return tree
+
+
+def _render_tree(root_name: str, tree: dict) -> tuple[str, frozenset[str]]:
+    """Render a nested dict of directories and files as a tree, directories first."""
+    lines = [root_name + "/"]
+    files = set()
+
+    def _render(node: dict, prefix: str, rel: str):
+        entries = sorted(node.items(), key=lambda item: (item[1] is None, item[0]))
+        for i, (name, children) in enumerate(entries):
+            is_last = i == len(entries) - 1
             connector = "└── " if is_last else "├── "
-            lines.append(f"{prefix}{connector}{entry.name}")
+            lines.append(f"{prefix}{connector}{name}")
 
-            if entry.is_dir():
+            if children is None:
+                files.add(rel + name)
+            else:
                 extension = "    " if is_last else "│   "
-                _walk(entry, prefix + extension, depth + 1)
+                _render(children, prefix + extension, f"{rel}{name}/")
 
-    lines.append(root.name + "/")
-    _walk(root, "", 1)
+    _render(tree, "", "")
+    return "\n".join(lines), frozenset(files)
 
-    return "\n".join(lines)
+
+@memoize_path
+def walk_repo(repo_path: str, max_depth: int = 4) -> tuple[str, frozenset[str]]:
+    """
+    Walk a repository once, returning its tree and the files seen.
+
+    Args:
+        repo_path: Path to repository root
+        max_depth: Maximum directory depth to traverse
+
+    Returns:
+        (formatted directory tree string, set of file paths relative to repo_path)
+    """
+    tracked = _list_tracked_files(repo_path)
+    if tracked is not None:
+        return _render_tree(os.path.basename(repo_path), _nest_paths(tracked, max_depth))
+
+    # Not a git work tree: walk the filesystem, pruning skipped and too-deep
+    # directories in place so os.walk never descends into them
+    tree: dict = {}
+    # Children dict and depth of each directory os.walk will visit
+    pending = {repo_path: (tree, 1)}
+    for dirpath, dirnames, filenames in os.walk(repo_path):
+        node, depth = pending.pop(dirpath)
+        dirnames[:] = [d for d in dirnames if d not in _SKIP_DIRS and not d.endswith(".egg-info")]
+        for name in dirnames:
+            node[name] = {}
+            if depth < max_depth:
+                pending[os.path.join(dirpath, name)] = (node[name], depth + 1)
+        for name in filenames:
+            if (name.startswith(".") and name in _SKIP_DIRS) or os.path.splitext(name)[1] in _SKIP_SUFFIXES:
+                continue
+            node[name] = None
+        if depth >= max_depth:
+            dirnames[:] = []
+
+    return _render_tree(os.path.basename(repo_path), tree)
 
 
 def get_commit_log(
@@ -147,6 +362,64 @@ def get_commit_log(
     return result.stdout
 
 
+def _import_names(tree: ast.AST) -> set[str]:
+    """
+    Collect the names a module's imports could refer to.
+
+    Each dotted name is recorded with every parent package and by its last
+    component, so `from pkg.sub import mod` indexes `pkg`, `pkg.sub`, `sub`,
+    `pkg.sub.mod` and `mod`.
+    """
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            dotted = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom):
+            dotted = [node.module] if node.module else []
+            prefix = f"{node.module}." if node.module else ""
+            dotted += [prefix + alias.name for alias in node.names if alias.name != "*"]
+        else:
+            continue
+        for name in dotted:
+            parts = name.split(".")
+            names.update(".".join(parts[:i]) for i in range(1, len(parts) + 1))
+            names.add(parts[-1])
+    return names
+
+
+def _file_import_names(path: str) -> set[str]:
+    """Parse one file for _build_import_index; unreadable or invalid files give nothing."""
+    content = get_file_content(path)
+    if content is None:
+        return set()
+    try:
+        return _import_names(ast.parse(content))
+    except (SyntaxError, ValueError, RecursionError, MemoryError):
+        return set()
+
+
+# Held while the import index is looked up or built, so concurrent topics
+# (each in its own to_thread worker) wait for one build instead of each
+# starting their own
+_IMPORT_INDEX_LOCK = threading.Lock()
+
+
+@functools.lru_cache(maxsize=1)
+def _build_import_index(repo_path: str) -> dict[str, tuple[str, ...]]:
+    """
+    Map every imported module name in a repository to the files importing it.
+
+    Parses each .py file once; files that don't parse are left out.
+    """
+    sources = [(rel, path) for rel, path in _iter_repo_files(repo_path) if rel.endswith(".py")]
+    index: dict[str, list[str]] = {}
+    for (rel, _), names in zip(sources, _map_files(_file_import_names, [path for _, path in sources])):
+        for name in names:
+            index.setdefault(name, []).append(rel)
+    return {name: tuple(files) for name, files in index.items()}
+
+
+@memoize_file
 def get_imports(file_path: str, repo_path: str) -> dict:
     """
     Analyze imports for a Python file.
@@ -160,38 +433,28 @@ def get_imports(file_path: str, repo_path: str) -> dict:
         return {"imports": [], "imported_by": []}
 
     # Parse imports from this file
-    imports = []
-    for line in content.split("\n"):
-        line = line.strip()
-        if line.startswith("import ") or line.startswith("from "):
-            imports.append(line)
+    imports = [match.group().strip() for match in _IMPORT_LINE_RE.finditer(content)]
 
     # Find files that import this module
     rel_path = os.path.relpath(file_path, repo_path)
     module_name = rel_path.replace("/", ".").replace(".py", "").replace(".__init__", "")
     # Also try the simple filename
-    simple_name = Path(file_path).stem
+    simple_name = os.path.splitext(os.path.basename(file_path))[0]
 
+    with _IMPORT_INDEX_LOCK:
+        index = _build_import_index(os.path.abspath(repo_path))
     imported_by = []
-    root = Path(repo_path)
-    for py_file in root.rglob("*.py"):
-        if str(py_file) == file_path:
-            continue
-        try:
-            py_content = py_file.read_text(encoding="utf-8")
-        except (UnicodeDecodeError, PermissionError):
-            continue
-        for line in py_content.split("\n"):
-            line = line.strip()
-            if (line.startswith("import ") or line.startswith("from ")) and (
-                module_name in line or simple_name in line
-            ):
-                imported_by.append(str(py_file.relative_to(root)))
-                break
+    for name in (module_name, module_name.removeprefix("src."), simple_name):
+        for importer in index.get(name, ()):
+            if importer != rel_path and importer not in imported_by:
+                imported_by.append(importer)
 
     return {"imports": imports, "imported_by": imported_by}
 
 
+_DEFINITION_NODES = (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)
+
+
 def extract_symbol(file_path: str, symbol: str) -> str | None:
     """
     Extract a function or class definition from a file.
@@ -208,6 +471,21 @@ def extract_symbol(file_path: str, symbol: str) -> str | None:
         return None
 
     lines = content.split("\n")
+    try:
+        tree = ast.parse(content)
+    except (SyntaxError, ValueError, RecursionError, MemoryError):
+        return _extract_symbol_by_indent(lines, symbol)
+
+    for node in ast.walk(tree):
+        if isinstance(node, _DEFINITION_NODES) and node.name == symbol:
+            # Decorators sit above the def/class line but belong to it
+            start = min([node.lineno] + [d.lineno for d in node.decorator_list])
+            return "\n".join(lines[start - 1:node.end_lineno])
+    return None
+
+
+def _extract_symbol_by_indent(lines: list[str], symbol: str) -> str | None:
+    """Line-based fallback for extract_symbol when the file doesn't parse."""
     result_lines = []
     capturing = False
     base_indent = None
@@ -255,6 +533,11 @@ def extract_symbol(file_path: str, symbol: str) -> str | None:
     return "\n".join(result_lines)
 
 
+def _is_test_file(name: str) -> bool:
+    """Whether a file name follows the test_*.py or *_test.py convention."""
+    return name.endswith(".py") and (name.startswith("test_") or name.endswith("_test.py"))
+
+
 def find_related_tests(file_path: str, repo_path: str, symbol: str | None = None) -> list[str]:
     """
     Find test files related to a source file or symbol.
@@ -267,31 +550,25 @@ def find_related_tests(file_path: str, repo_path: str, symbol: str | None = None
     Returns:
         List of related test file paths (relative to repo)
     """
-    root = Path(repo_path)
-    source_name = Path(file_path).stem
-    related = []
-
-    for test_file in root.rglob("test_*.py"):
-        rel = str(test_file.relative_to(root))
+    source_name = os.path.splitext(os.path.basename(file_path))[0]
+    # Only a substring test is needed, so compare bytes and skip decoding
+    symbol_bytes = symbol.encode("utf-8") if symbol else None
+    candidates = []
+    for rel, path in _iter_repo_files(repo_path):
+        name = os.path.basename(rel)
+        if _is_test_file(name):
+            candidates.append((rel, path, source_name in name))
+
+    def _is_related(candidate) -> bool:
+        _, path, name_matches = candidate
         # Check if test file name matches source file
-        if source_name in test_file.name:
-            related.append(rel)
-            continue
-
+        if name_matches:
+            return True
         # If symbol provided, check if test file references it
-        if symbol:
-            try:
-                content = test_file.read_text(encoding="utf-8")
-                if symbol in content:
-                    related.append(rel)
-            except (UnicodeDecodeError, PermissionError):
-                continue
-
-    # Also check tests/ directory for *_test.py pattern
-    for test_file in root.rglob("*_test.py"):
-        rel = str(test_file.relative_to(root))
-        if rel not in related:
-            if source_name in test_file.name:
-                related.append(rel)
+        if not symbol_bytes:
+            return False
+        data = _get_file_bytes(path)
+        return data is not None and symbol_bytes in data
 
+    related = [rel for (rel, _, _), hit in zip(candidates, _map_files(_is_related, candidates)) if hit]
     return related
@@ -8,6 +8,7 @@ targeted results back. This keeps prompts focused and fast.
 
 from __future__ import annotations
 
+import ast
 import asyncio
 import inspect
 import json
@@ -79,7 +80,7 @@ async def read_file(file_path: str, repo_path: str, start_line: int = 0, max_lin
         if not full_path.is_file():
             return {"error": f"File not found: {file_path}", "file": file_path}
 
-        content = full_path.read_text(encoding="utf-8")
+        content = await asyncio.to_thread(full_path.read_text, encoding="utf-8")
         lines = content.split("\n")
         total_lines = len(lines)
 
@@ -137,7 +138,7 @@ async def list_directory(dir_path: str, repo_path: str, max_depth: int = 2) -> d
                 else:
                     entries.append({"path": rel, "type": "file"})
 
-        _walk(full_path, 1, "")
+        await asyncio.to_thread(_walk, full_path, 1, "")
 
         return {
             "dir": dir_path,
@@ -252,12 +253,10 @@ async def file_imports(file_path: str, repo_path: str) -> dict[str, Any]:
     Returns:
         Dict with imports
     """
-    import ast
-
     try:
         full_path = Path(repo_path) / file_path
-        source = full_path.read_text(encoding="utf-8")
-        tree = ast.parse(source)
+        source = await asyncio.to_thread(full_path.read_text, encoding="utf-8")
+        tree = await asyncio.to_thread(ast.parse, source)
 
         imports = []
         from_imports = []
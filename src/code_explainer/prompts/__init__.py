@@ -3,6 +3,7 @@
 from .common import TOPICS_INSTRUCTIONS
 from .diff import build_diff_prompt
 from .file import build_file_prompt
+from .general import build_general_prompt
 from .function import build_function_prompt
 from .repo import build_repo_prompt
 
@@ -11,5 +12,6 @@ __all__ = [
     "build_function_prompt",
     "build_repo_prompt",
     "build_diff_prompt",
+    "build_general_prompt",
     "TOPICS_INSTRUCTIONS",
 ]
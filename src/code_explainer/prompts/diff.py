@@ -1,7 +1,23 @@
 """Prompt template for diff explanation."""
 
+import io
+
 from .common import TOPICS_INSTRUCTIONS
 
+INSTRUCTIONS = """## Instructions
+
+Explain these changes covering:
+
+1. **Summary**: One-paragraph overview of what changed
+2. **Motivation**: Why were these changes made? (infer from commit messages and code)
+3. **File-by-File Breakdown**: For each changed file, explain what changed and why
+4. **Impact**: What behavior changes as a result?
+5. **Risks**: Any potential issues or things to watch out for
+
+Format your response as markdown.
+Focus on the 'why' — don't just describe what lines were added/removed.
+"""
+
 
 def build_diff_prompt(
     diff_content: str,
@@ -16,51 +32,22 @@ def build_diff_prompt(
         commit_log: Commit messages for the changes
         changed_files_summary: List of changed file paths
     """
-    sections = [
-        "You are a senior software engineer explaining code changes to a colleague.",
-        "Explain what changed in this diff and why.",
-        "",
-    ]
+    buf = io.StringIO()
+    buf.write(
+        "You are a senior software engineer explaining code changes to a colleague.\n"
+        "Explain what changed in this diff and why.\n"
+        "\n"
+    )
 
     if commit_log:
-        sections.extend([
-            "## Commit History",
-            "",
-            "```",
-            commit_log,
-            "```",
-            "",
-        ])
+        buf.write(f"## Commit History\n\n```\n{commit_log}\n```\n\n")
 
     if changed_files_summary:
-        sections.extend([
-            "## Changed Files",
-            "",
-        ])
-        for f in changed_files_summary:
-            sections.append(f"- `{f}`")
-        sections.append("")
-
-    sections.extend([
-        "## Diff",
-        "",
-        "```diff",
-        diff_content,
-        "```",
-        "",
-        "## Instructions",
-        "",
-        "Explain these changes covering:",
-        "",
-        "1. **Summary**: One-paragraph overview of what changed",
-        "2. **Motivation**: Why were these changes made? (infer from commit messages and code)",
-        "3. **File-by-File Breakdown**: For each changed file, explain what changed and why",
-        "4. **Impact**: What behavior changes as a result?",
-        "5. **Risks**: Any potential issues or things to watch out for",
-        "",
-        "Format your response as markdown.",
-        "Focus on the 'why' — don't just describe what lines were added/removed.",
-        TOPICS_INSTRUCTIONS,
-    ])
-
-    return "\n".join(sections)
+        buf.write("## Changed Files\n\n")
+        buf.write("".join(f"- `{f}`\n" for f in changed_files_summary))
+        buf.write("\n")
+
+    buf.write(f"## Diff\n\n```diff\n{diff_content}\n```\n\n")
+    buf.write(INSTRUCTIONS)
+    buf.write(TOPICS_INSTRUCTIONS)
+    return buf.getvalue()
@@ -1,7 +1,46 @@
 """Prompt template for file explanation."""
 
+import io
+import os
+
 from .common import TOPICS_INSTRUCTIONS
 
+INSTRUCTIONS = """## Instructions
+
+Explain this file covering:
+
+1. **Purpose**: What is this file's role in the project?
+2. **Key Components**: Important classes, functions, and constants
+3. **Patterns**: Design patterns or idioms used
+4. **Dependencies**: What it depends on and what depends on it
+5. **Flow**: How the code executes (control flow, data transformations)
+
+Format your response as markdown.
+Be concrete — reference specific functions, classes, and line-level details.
+"""
+
+# Code fence language by file extension
+_EXT_MAP = {
+    ".py": "python",
+    ".js": "javascript",
+    ".ts": "typescript",
+    ".tsx": "tsx",
+    ".jsx": "jsx",
+    ".rs": "rust",
+    ".go": "go",
+    ".java": "java",
+    ".rb": "ruby",
+    ".sh": "bash",
+    ".yml": "yaml",
+    ".yaml": "yaml",
+    ".toml": "toml",
+    ".json": "json",
+    ".md": "markdown",
+    ".sql": "sql",
+    ".html": "html",
+    ".css": "css",
+}
+
 
 def build_file_prompt(
     file_path: str,
@@ -20,91 +59,33 @@ def build_file_prompt(
         imported_by: List of files that import this file
         repo_context: Brief repo structure context
     """
-    sections = [
-        "You are a senior software engineer explaining code to a colleague.",
-        f"Explain the following file: `{file_path}`",
-        "",
-    ]
+    buf = io.StringIO()
+    buf.write(
+        "You are a senior software engineer explaining code to a colleague.\n"
+        f"Explain the following file: `{file_path}`\n"
+        "\n"
+    )
 
     if repo_context:
-        sections.extend([
-            "## Repository Context",
-            "",
-            "```",
-            repo_context,
-            "```",
-            "",
-        ])
-
-    sections.extend([
-        "## File Content",
-        "",
-        f"```{_guess_language(file_path)}",
-        file_content,
-        "```",
-        "",
-    ])
+        buf.write(f"## Repository Context\n\n```\n{repo_context}\n```\n\n")
+
+    buf.write(f"## File Content\n\n```{_guess_language(file_path)}\n{file_content}\n```\n\n")
 
     if imports:
-        sections.extend([
-            "## Imports",
-            "",
-        ])
-        for imp in imports:
-            sections.append(f"- `{imp}`")
-        sections.append("")
+        buf.write("## Imports\n\n")
+        buf.write("".join(f"- `{imp}`\n" for imp in imports))
+        buf.write("\n")
 
     if imported_by:
-        sections.extend([
-            "## Imported By",
-            "",
-        ])
-        for f in imported_by:
-            sections.append(f"- `{f}`")
-        sections.append("")
-
-    sections.extend([
-        "## Instructions",
-        "",
-        "Explain this file covering:",
-        "",
-        "1. **Purpose**: What is this file's role in the project?",
-        "2. **Key Components**: Important classes, functions, and constants",
-        "3. **Patterns**: Design patterns or idioms used",
-        "4. **Dependencies**: What it depends on and what depends on it",
-        "5. **Flow**: How the code executes (control flow, data transformations)",
-        "",
-        "Format your response as markdown.",
-        "Be concrete — reference specific functions, classes, and line-level details.",
-        TOPICS_INSTRUCTIONS,
-    ])
-
-    return "\n".join(sections)
+        buf.write("## Imported By\n\n")
+        buf.write("".join(f"- `{f}`\n" for f in imported_by))
+        buf.write("\n")
+
+    buf.write(INSTRUCTIONS)
+    buf.write(TOPICS_INSTRUCTIONS)
+    return buf.getvalue()
 
 
 def _guess_language(file_path: str) -> str:
     """Guess language from file extension for syntax highlighting."""
-    ext_map = {
-        ".py": "python",
-        ".js": "javascript",
-        ".ts": "typescript",
-        ".tsx": "tsx",
-        ".jsx": "jsx",
-        ".rs": "rust",
-        ".go": "go",
-        ".java": "java",
-        ".rb": "ruby",
-        ".sh": "bash",
-        ".yml": "yaml",
-        ".yaml": "yaml",
-        ".toml": "toml",
-        ".json": "json",
-        ".md": "markdown",
-        ".sql": "sql",
-        ".html": "html",
-        ".css": "css",
-    }
-    for ext, lang in ext_map.items():
-        if file_path.endswith(ext):
-            return lang
-    return ""
+    return _EXT_MAP.get(os.path.splitext(file_path)[1].lower(), "")
@@ -1,7 +1,25 @@
 """Prompt template for function/class explanation."""
 
+import io
+
 from .common import TOPICS_INSTRUCTIONS
 
+INSTRUCTIONS = """## Instructions
+
+Explain this function/class covering:
+
+1. **Purpose**: What does it do and why does it exist?
+2. **Parameters**: What each parameter means and expected types/values
+3. **Return Value**: What it returns and when
+4. **Algorithm**: Step-by-step walkthrough of the logic
+5. **Side Effects**: Any mutations, I/O, or state changes
+6. **Error Handling**: How errors are handled or propagated
+7. **Usage**: How this is typically called (based on context)
+
+Format your response as markdown.
+Be precise — explain the actual logic, not just paraphrase the code.
+"""
+
 
 def build_function_prompt(
     file_path: str,
@@ -20,55 +38,26 @@ def build_function_prompt(
         full_file_content: Full file for additional context
         related_tests: Paths to related test files
     """
-    sections = [
-        "You are a senior software engineer explaining code to a colleague.",
-        f"Explain the following symbol `{symbol_name}` from `{file_path}`.",
-        "",
-        "## Source Code",
-        "",
-        "```python",
-        symbol_source,
-        "```",
-        "",
-    ]
+    buf = io.StringIO()
+    buf.write(
+        "You are a senior software engineer explaining code to a colleague.\n"
+        f"Explain the following symbol `{symbol_name}` from `{file_path}`.\n"
+        "\n"
+        f"## Source Code\n\n```python\n{symbol_source}\n```\n\n"
+    )
 
     if full_file_content:
-        sections.extend([
-            "## Full File Context",
-            "",
-            f"The symbol is defined in `{file_path}`. Here is the full file for context:",
-            "",
-            "```python",
-            full_file_content,
-            "```",
-            "",
-        ])
+        buf.write(
+            "## Full File Context\n\n"
+            f"The symbol is defined in `{file_path}`. Here is the full file for context:\n\n"
+            f"```python\n{full_file_content}\n```\n\n"
+        )
 
     if related_tests:
-        sections.extend([
-            "## Related Tests",
-            "",
-        ])
-        for test in related_tests:
-            sections.append(f"- `{test}`")
-        sections.append("")
-
-    sections.extend([
-        "## Instructions",
-        "",
-        "Explain this function/class covering:",
-        "",
-        "1. **Purpose**: What does it do and why does it exist?",
-        "2. **Parameters**: What each parameter means and expected types/values",
-        "3. **Return Value**: What it returns and when",
-        "4. **Algorithm**: Step-by-step walkthrough of the logic",
-        "5. **Side Effects**: Any mutations, I/O, or state changes",
-        "6. **Error Handling**: How errors are handled or propagated",
-        "7. **Usage**: How this is typically called (based on context)",
-        "",
-        "Format your response as markdown.",
-        "Be precise — explain the actual logic, not just paraphrase the code.",
-        TOPICS_INSTRUCTIONS,
-    ])
+        buf.write("## Related Tests\n\n")
+        buf.write("".join(f"- `{test}`\n" for test in related_tests))
+        buf.write("\n")
 
-    return "\n".join(sections)
+    buf.write(INSTRUCTIONS)
+    buf.write(TOPICS_INSTRUCTIONS)
+    return buf.getvalue()
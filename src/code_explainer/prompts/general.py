@@ -0,0 +1,48 @@
+"""Prompt template for general topic explanation."""
+
+import json
+from typing import Any
+
+from .common import TOPICS_INSTRUCTIONS
+
+GENERAL_PROMPT = """You are a senior software engineer explaining a codebase to a new team member.
+The reader wants to understand: **{question}**
+
+{observations_section}## Instructions
+
+Explain **{question}** based on the observations above.
+Reference specific files, functions, and line numbers from the observations.
+If the observations are insufficient, say what's missing.
+
+Format your response as markdown.
+{topics_instructions}"""
+
+OBSERVATIONS_SECTION = """## Observations
+
+The following information was gathered from the codebase:
+
+```json
+{observations_json}
+```
+
+"""
+
+
+def build_general_prompt(question: str, observations: dict[str, Any] | None = None) -> str:
+    """
+    Build prompt for explaining a general topic from gathered observations.
+
+    Args:
+        question: What the reader wants to understand
+        observations: Observation results keyed by observation name
+    """
+    observations_section = ""
+    if observations:
+        observations_section = OBSERVATIONS_SECTION.format(
+            observations_json=json.dumps(observations, indent=2, default=str),
+        )
+    return GENERAL_PROMPT.format(
+        question=question,
+        observations_section=observations_section,
+        topics_instructions=TOPICS_INSTRUCTIONS,
+    )
@@ -1,7 +1,27 @@
 """Prompt template for repository overview explanation."""
 
+import io
+
 from .common import TOPICS_INSTRUCTIONS
 
+INSTRUCTIONS = """
+## Instructions
+
+Write a comprehensive overview covering:
+
+1. **Purpose**: What does this project do? What problem does it solve?
+2. **Architecture**: High-level architecture and design patterns used
+3. **Key Components**: The most important modules/packages and their roles
+4. **Data Flow**: How data flows through the system
+5. **Dependencies**: Notable external dependencies and why they're used
+6. **Entry Points**: How the application is started/invoked
+7. **Configuration**: How the project is configured
+
+Format your response as markdown with clear sections and headers.
+Be specific — reference actual file and directory names from the tree.
+Focus on helping someone new understand the codebase quickly.
+"""
+
 
 def build_repo_prompt(
     tree: str,
@@ -18,62 +38,24 @@ def build_repo_prompt(
         readme_content: README content if present
         entry_points: List of identified entry point files
     """
-    sections = [
-        "You are a senior software engineer explaining a codebase to a new team member.",
-        "Provide a clear, structured overview of this repository.",
-        "",
-        "## Directory Structure",
-        "",
-        "```",
-        tree,
-        "```",
-    ]
+    buf = io.StringIO()
+    buf.write(
+        "You are a senior software engineer explaining a codebase to a new team member.\n"
+        "Provide a clear, structured overview of this repository.\n"
+        "\n"
+        f"## Directory Structure\n\n```\n{tree}\n```\n"
+    )
 
     if config_content:
-        sections.extend([
-            "",
-            "## Project Configuration",
-            "",
-            "```",
-            config_content,
-            "```",
-        ])
+        buf.write(f"\n## Project Configuration\n\n```\n{config_content}\n```\n")
 
     if readme_content:
-        sections.extend([
-            "",
-            "## README",
-            "",
-            readme_content,
-        ])
+        buf.write(f"\n## README\n\n{readme_content}\n")
 
     if entry_points:
-        sections.extend([
-            "",
-            "## Entry Points",
-            "",
-        ])
-        for ep in entry_points:
-            sections.append(f"- {ep}")
-
-    sections.extend([
-        "",
-        "## Instructions",
-        "",
-        "Write a comprehensive overview covering:",
-        "",
-        "1. **Purpose**: What does this project do? What problem does it solve?",
-        "2. **Architecture**: High-level architecture and design patterns used",
-        "3. **Key Components**: The most important modules/packages and their roles",
-        "4. **Data Flow**: How data flows through the system",
-        "5. **Dependencies**: Notable external dependencies and why they're used",
-        "6. **Entry Points**: How the application is started/invoked",
-        "7. **Configuration**: How the project is configured",
-        "",
-        "Format your response as markdown with clear sections and headers.",
-        "Be specific — reference actual file and directory names from the tree.",
-        "Focus on helping someone new understand the codebase quickly.",
-        TOPICS_INSTRUCTIONS,
-    ])
+        buf.write("\n## Entry Points\n\n")
+        buf.write("".join(f"- {ep}\n" for ep in entry_points))
 
-    return "\n".join(sections)
+    buf.write(INSTRUCTIONS)
+    buf.write(TOPICS_INSTRUCTIONS)
+    return buf.getvalue()
@@ -1,13 +1,19 @@
 """Embedded skill content for install-skill command."""
 
+import functools
 from pathlib import Path
 
 # Read skill content from the bundled SKILL.md
 _SKILL_PATH = Path(__file__).parent.parent.parent / ".claude" / "skills" / "code-explainer" / "SKILL.md"
 
 
+@functools.cache
 def get_skill_content() -> str:
-    """Get skill content, falling back to embedded version if file not found."""
+    """
+    Get skill content, falling back to embedded version if file not found.
+
+    The bundled file doesn't change while the process runs, so it is read once.
+    """
     if _SKILL_PATH.is_file():
         return _SKILL_PATH.read_text()
     return _EMBEDDED_SKILL
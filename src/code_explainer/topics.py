@@ -7,14 +7,16 @@ isolated explanations into a guided exploration session.
 
 from __future__ import annotations
 
+import copy
 import json
 import os
 import re
+import stat
 from dataclasses import asdict, dataclass, field
 from datetime import datetime
 
 
-@dataclass
+@dataclass(slots=True)
 class Topic:
     """A queued exploration topic."""
 
@@ -28,25 +30,83 @@ class Topic:
     source: str = ""
     # Status: pending, done, skipped
     status: str = "pending"
+    # Where the explanation was saved, once done
+    output: str = ""
     # When it was added
     added: str = field(default_factory=lambda: datetime.now().isoformat(timespec="seconds"))
 
+    @classmethod
+    def from_tuple(cls, fields: tuple[str, ...]) -> Topic:
+        """Build a topic from positional fields, e.g. (title, kind, target)."""
+        return cls(*fields)
+
 
 TOPIC_KINDS = {"file", "function", "repo", "diff", "general"}
 
 
+# Parsed queues by file path, with the (mtime_ns, size) they were read or written at
+_QUEUE_CACHE: dict[str, tuple[tuple[int, int], list[Topic]]] = {}
+# Targets in each cached queue, with the file key they were collected at
+_TARGETS_INDEX: dict[str, tuple[tuple[int, int], set[str]]] = {}
+
+
 def _queue_path(output_dir: str) -> str:
     return os.path.join(output_dir, "topics.json")
 
 
-def load_queue(output_dir: str) -> list[Topic]:
-    """Load the topics queue from disk."""
-    path = _queue_path(output_dir)
-    if not os.path.isfile(path):
+def _file_key(path: str) -> tuple[int, int] | None:
+    """(mtime_ns, size) of a regular file, or None if there isn't one."""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    if not stat.S_ISREG(st.st_mode):
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def _cached_queue(output_dir: str) -> list[Topic]:
+    """
+    The parsed queue for `output_dir`, re-read only when the file changed.
+
+    The list is shared with the cache; callers must not modify it.
+    """
+    path = os.path.abspath(_queue_path(output_dir))
+    key = _file_key(path)
+    if key is None:
+        _QUEUE_CACHE.pop(path, None)
         return []
+    cached = _QUEUE_CACHE.get(path)
+    if cached is not None and cached[0] == key:
+        return cached[1]
     with open(path, encoding="utf-8") as f:
         data = json.load(f)
-    return [Topic(**item) for item in data]
+    queue = [Topic(**item) for item in data]
+    _QUEUE_CACHE[path] = (key, queue)
+    return queue
+
+
+def _queue_targets(output_dir: str) -> set[str]:
+    """
+    The set of targets in the queue for `output_dir`.
+
+    Collected once per version of the file and shared with the index.
+    """
+    queue = _cached_queue(output_dir)
+    path = os.path.abspath(_queue_path(output_dir))
+    cached = _QUEUE_CACHE.get(path)
+    if cached is None:
+        return set()
+    indexed = _TARGETS_INDEX.get(path)
+    if indexed is None or indexed[0] != cached[0]:
+        indexed = (cached[0], {t.target for t in queue})
+        _TARGETS_INDEX[path] = indexed
+    return indexed[1]
+
+
+def load_queue(output_dir: str) -> list[Topic]:
+    """Load the topics queue from disk."""
+    return [copy.copy(t) for t in _cached_queue(output_dir)]
 
 
 def save_queue(output_dir: str, queue: list[Topic]) -> None:
@@ -55,6 +115,12 @@ def save_queue(output_dir: str, queue: list[Topic]) -> None:
     path = _queue_path(output_dir)
     with open(path, "w", encoding="utf-8") as f:
         json.dump([asdict(t) for t in queue], f, indent=2)
+        f.flush()
+        st = os.fstat(f.fileno())
+    _QUEUE_CACHE[os.path.abspath(path)] = (
+        (st.st_mtime_ns, st.st_size),
+        [copy.copy(t) for t in queue],
+    )
 
 
 def add_topics(output_dir: str, topics: list[Topic]) -> int:
@@ -63,17 +129,24 @@ def add_topics(output_dir: str, topics: list[Topic]) -> int:
 
     Returns number of new topics added.
     """
-    queue = load_queue(output_dir)
-    existing_targets = {t.target for t in queue}
-    added = 0
+    targets = _queue_targets(output_dir)
+    new_topics = []
     for topic in topics:
-        if topic.target not in existing_targets:
-            queue.append(topic)
-            existing_targets.add(topic.target)
-            added += 1
-    if added:
-        save_queue(output_dir, queue)
-    return added
+        if topic.target not in targets:
+            new_topics.append(topic)
+            targets.add(topic.target)
+    if not new_topics:
+        return 0
+
+    path = os.path.abspath(_queue_path(output_dir))
+    try:
+        save_queue(output_dir, load_queue(output_dir) + new_topics)
+    except Exception:
+        _TARGETS_INDEX.pop(path, None)
+        raise
+    # The set already holds the new targets; carry it over to the new file version
+    _TARGETS_INDEX[path] = (_QUEUE_CACHE[path][0], targets)
+    return len(new_topics)
 
 
 def pop_next(output_dir: str) -> Topic | None:
@@ -91,6 +164,61 @@ def pop_next(output_dir: str) -> Topic | None:
     return None
 
 
+def pop_batch(output_dir: str, count: int) -> list[Topic]:
+    """
+    Get up to `count` pending topics and mark them as done.
+
+    Returns an empty list if queue is empty or all done.
+    """
+    queue = load_queue(output_dir)
+    popped = []
+    for topic in queue:
+        if len(popped) >= count:
+            break
+        if topic.status == "pending":
+            topic.status = "done"
+            popped.append(topic)
+    if popped:
+        save_queue(output_dir, queue)
+    return popped
+
+
+def record_output(output_dir: str, kind: str, target: str, output: str) -> int:
+    """
+    Mark every topic for `(kind, target)` done and point it at `output`.
+
+    Skipped topics are left alone. Returns number of topics updated.
+    """
+    queue = load_queue(output_dir)
+    updated = 0
+    for topic in queue:
+        if topic.kind == kind and topic.target == target and topic.status != "skipped":
+            topic.status = "done"
+            topic.output = output
+            updated += 1
+    if updated:
+        save_queue(output_dir, queue)
+    return updated
+
+
+def requeue(output_dir: str, kind: str, target: str) -> int:
+    """
+    Return popped topics for `(kind, target)` to pending after a failed run.
+
+    Only topics marked done without a recorded output are reset, so finished
+    explanations stay done. Returns number of topics requeued.
+    """
+    queue = load_queue(output_dir)
+    requeued = 0
+    for topic in queue:
+        if topic.kind == kind and topic.target == target and topic.status == "done" and not topic.output:
+            topic.status = "pending"
+            requeued += 1
+    if requeued:
+        save_queue(output_dir, queue)
+    return requeued
+
+
 def pop_at(output_dir: str, index: int) -> Topic | None:
     """Get a pending topic by index and mark it as done.
 
@@ -118,7 +246,7 @@ def skip_topic(output_dir: str, index: int) -> bool:
 
 def pending_count(output_dir: str) -> int:
     """Count pending topics."""
-    return sum(1 for t in load_queue(output_dir) if t.status == "pending")
+    return sum(1 for t in _cached_queue(output_dir) if t.status == "pending")
 
 
 # --- Parsing topics from model output ---
@@ -141,6 +269,10 @@ TOPIC_LINE_PATTERN = re.compile(
 )
 
 
+# The "Topics to Explore" heading; its section runs to the next heading
+_TOPICS_HEADING_RE = re.compile(r"#+\s*Topics?\s+to\s+Explore\s*\n", re.IGNORECASE)
+
+
 def parse_topics_from_response(response: str, source: str = "") -> list[Topic]:
     """
     Parse follow-up topics from a model response.
@@ -148,18 +280,20 @@ def parse_topics_from_response(response: str, source: str = "") -> list[Topic]:
     Looks for a "Topics to Explore" section with structured items.
     """
     # Find the topics section
-    section_match = re.search(
-        r"#+\s*Topics?\s+to\s+Explore\s*\n(.*?)(?=\n#|\Z)",
-        response,
-        re.DOTALL | re.IGNORECASE,
-    )
-    if not section_match:
+    heading = _TOPICS_HEADING_RE.search(response)
+    if not heading:
         return []
+    start = heading.end()
+    # A plain substring search for the next heading, instead of a lazy
+    # match that re-tests a lookahead at every character of the section
+    end = response.find("\n#", start)
+    if end == -1:
+        end = len(response)
 
-    section_text = section_match.group(1)
     topics = []
 
-    for match in TOPIC_LINE_PATTERN.finditer(section_text):
+    # Scan the section in place rather than slicing it out of the response
+    for match in TOPIC_LINE_PATTERN.finditer(response, start, end):
         kind = match.group(1).lower()
         target = match.group(2)
         title = match.group(3).strip()
@@ -0,0 +1,58 @@
+"""Shared fixtures for code-explainer tests."""
+
+import shutil
+
+import pytest
+from click.testing import CliRunner
+
+from code_explainer.topics import Topic, save_queue
+
+
+@pytest.fixture(scope="session")
+def runner():
+    """One CliRunner shared by every test; it keeps no state between invocations."""
+    return CliRunner()
+
+
+@pytest.fixture(scope="session")
+def sample_py(tmp_path_factory):
+    """Directory of small Python sources for the extract tests, written once."""
+    src = tmp_path_factory.mktemp("src")
+    (src / "hello.py").write_text(
+        'def hello(name):\n'
+        '    """Say hello."""\n'
+        '    return f"Hello, {name}!"\n'
+        '\n'
+        'def goodbye():\n'
+        '    return "bye"\n'
+    )
+    (src / "myclass.py").write_text(
+        'class MyClass:\n'
+        '    def __init__(self):\n'
+        '        self.x = 1\n'
+        '\n'
+        '    def method(self):\n'
+        '        return self.x\n'
+        '\n'
+        'other_var = 42\n'
+    )
+    return src
+
+
+@pytest.fixture(scope="session")
+def seed_queue(tmp_path_factory):
+    """A topics.json with three pending topics, encoded once per session."""
+    seed = tmp_path_factory.mktemp("seed")
+    save_queue(str(seed), [Topic.from_tuple(t) for t in [
+        ("Executor module", "file", "src/executor.py", "repo-overview"),
+        ("Router logic", "function", "src/router.py:route", "repo-overview"),
+        ("Architecture", "general", "architecture"),
+    ]])
+    return seed / "topics.json"
+
+
+@pytest.fixture
+def queue_dir(tmp_path, seed_queue):
+    """Output dir holding a private copy of the seed queue."""
+    shutil.copyfile(seed_queue, tmp_path / "topics.json")
+    return str(tmp_path)
@@ -1,13 +1,35 @@
 """Tests for code-explainer CLI."""
 
+import asyncio
 import json
 import os
-import tempfile
-
-from click.testing import CliRunner
-
-from code_explainer.cli import cli, _sanitize_path_for_filename, _find_project_config
-from code_explainer.git_utils import extract_symbol, get_repo_structure, get_imports
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from code_explainer.explainer import MODEL_COMMANDS, MODEL_LIMITS, _cache_path, check_model_available, explain
+from code_explainer.prompts import build_diff_prompt
+from code_explainer.cli import (
+    cli,
+    _changed_files,
+    _diff_max_bytes,
+    _find_entry_points,
+    _find_project_config,
+    _sanitize_path_for_filename,
+)
+from code_explainer.git_utils import (
+    _run_capped,
+    extract_symbol,
+    find_related_tests,
+    get_diff,
+    get_diff_stat,
+    get_file_content,
+    get_imports,
+    get_repo_structure,
+    walk_repo,
+)
 from code_explainer.topics import (
     Topic,
     add_topics,
@@ -15,196 +37,453 @@ from code_explainer.topics import (
     parse_topics_from_response,
     pending_count,
     pop_at,
+    pop_batch,
     pop_next,
+    record_output,
+    requeue,
     save_queue,
     skip_topic,
 )
 
 
-def test_cli_help():
-    """CLI loads and shows help."""
-    runner = CliRunner()
+def test_cli_help(runner):
+    """CLI loads and its help lists every subcommand."""
     result = runner.invoke(cli, ["--help"])
     assert result.exit_code == 0
     assert "AI-powered code explanation tool" in result.output
+    for name in ("file", "function", "repo", "diff", "topics", "next", "pick"):
+        assert name in result.output
 
 
-def test_cli_version():
+def test_cli_version(runner):
     """CLI shows version."""
-    runner = CliRunner()
     result = runner.invoke(cli, ["--version"])
     assert result.exit_code == 0
     assert "0.1.0" in result.output
 
 
-def test_subcommands_exist():
-    """All subcommands are registered."""
-    runner = CliRunner()
-    result = runner.invoke(cli, ["--help"])
-    assert "file" in result.output
-    assert "function" in result.output
-    assert "repo" in result.output
-    assert "diff" in result.output
-    assert "topics" in result.output
-    assert "next" in result.output
-
-
-def test_file_help():
-    runner = CliRunner()
-    result = runner.invoke(cli, ["file", "--help"])
-    assert result.exit_code == 0
-    assert "Explain a file" in result.output
-
-
-def test_function_help():
-    runner = CliRunner()
-    result = runner.invoke(cli, ["function", "--help"])
-    assert result.exit_code == 0
-    assert "function or class" in result.output
-
-
-def test_repo_help():
-    runner = CliRunner()
-    result = runner.invoke(cli, ["repo", "--help"])
-    assert result.exit_code == 0
-    assert "repository" in result.output.lower()
-
-
-def test_diff_help():
-    runner = CliRunner()
-    result = runner.invoke(cli, ["diff", "--help"])
-    assert result.exit_code == 0
-    assert "diff" in result.output.lower()
-
-
-def test_topics_help():
-    runner = CliRunner()
-    result = runner.invoke(cli, ["topics", "--help"])
-    assert result.exit_code == 0
-    assert "exploration queue" in result.output.lower()
-
-
-def test_next_help():
-    runner = CliRunner()
-    result = runner.invoke(cli, ["next", "--help"])
+@pytest.mark.parametrize(
+    "command,needle",
+    [
+        ("file", "explain a file"),
+        ("function", "function or class"),
+        ("repo", "repository"),
+        ("diff", "diff"),
+        ("topics", "exploration queue"),
+        ("next", "next topic"),
+        ("pick", "pick a topic"),
+    ],
+)
+def test_subcommand_help(runner, command, needle):
+    result = runner.invoke(cli, [command, "--help"])
     assert result.exit_code == 0
-    assert "next topic" in result.output.lower()
-
+    assert needle in result.output.lower()
 
-def test_sanitize_path():
-    assert _sanitize_path_for_filename("src/auth/client.py") == "src-auth-client"
-    assert _sanitize_path_for_filename("main.py") == "main"
-    assert _sanitize_path_for_filename("a/b/c.rs") == "a-b-c"
 
-
-def test_extract_symbol():
+@pytest.mark.parametrize(
+    "path,expected",
+    [
+        ("src/auth/client.py", "src-auth-client"),
+        ("main.py", "main"),
+        ("a/b/c.rs", "a-b-c"),
+    ],
+)
+def test_sanitize_path(path, expected):
+    assert _sanitize_path_for_filename(path) == expected
+
+
+def test_changed_files():
+    diff = (
+        "diff --git a/src/app.py b/src/app.py\n"
+        "--- a/src/app.py\n"
+        "+++ b/src/app.py\n"
+        "@@ -1 +1 @@\n"
+        "-old\n"
+        "+new\n"
+        "diff --git a/gone.py b/gone.py\n"
+        "--- a/gone.py\n"
+        "+++ /dev/null\n"
+        "diff --git a/new.py b/new.py\n"
+        "--- /dev/null\n"
+        "+++ b/new.py\n"
+    )
+    assert _changed_files(diff) == ["src/app.py", "new.py"]
+    assert _changed_files("+++ b/first.py\n+x\n+++ b/last.py") == ["first.py", "last.py"]
+    assert _changed_files("") == []
+
+
+def test_extract_symbol(sample_py):
     """Test function extraction from source code."""
-    with tempfile.NamedTemporaryFile(mode="w", suffix=".py", delete=False) as f:
-        f.write(
-            'def hello(name):\n'
-            '    """Say hello."""\n'
-            '    return f"Hello, {name}!"\n'
-            '\n'
-            'def goodbye():\n'
-            '    return "bye"\n'
-        )
-        f.flush()
+    path = str(sample_py / "hello.py")
 
-        result = extract_symbol(f.name, "hello")
-        assert result is not None
-        assert "def hello" in result
-        assert "Hello" in result
+    result = extract_symbol(path, "hello")
+    assert result is not None
+    assert "def hello" in result
+    assert "Hello" in result
 
-        result2 = extract_symbol(f.name, "goodbye")
-        assert result2 is not None
-        assert "def goodbye" in result2
+    result2 = extract_symbol(path, "goodbye")
+    assert result2 is not None
+    assert "def goodbye" in result2
 
-        result3 = extract_symbol(f.name, "nonexistent")
-        assert result3 is None
+    result3 = extract_symbol(path, "nonexistent")
+    assert result3 is None
 
-        os.unlink(f.name)
 
-
-def test_extract_class():
+def test_extract_class(sample_py):
     """Test class extraction."""
-    with tempfile.NamedTemporaryFile(mode="w", suffix=".py", delete=False) as f:
-        f.write(
-            'class MyClass:\n'
-            '    def __init__(self):\n'
-            '        self.x = 1\n'
-            '\n'
-            '    def method(self):\n'
-            '        return self.x\n'
-            '\n'
-            'other_var = 42\n'
-        )
-        f.flush()
-
-        result = extract_symbol(f.name, "MyClass")
-        assert result is not None
-        assert "class MyClass" in result
-        assert "__init__" in result
-        assert "method" in result
-
-        os.unlink(f.name)
-
-
-def test_get_repo_structure():
+    result = extract_symbol(str(sample_py / "myclass.py"), "MyClass")
+    assert result is not None
+    assert "class MyClass" in result
+    assert "__init__" in result
+    assert "method" in result
+
+
+def test_extract_decorated_symbol(tmp_path):
+    """Extraction includes decorators and multiline signatures, with a fallback for bad syntax."""
+    path = tmp_path / "decorated.py"
+    path.write_text(
+        '@cache\n'
+        '@trace(level=2)\n'
+        'def lookup(\n'
+        '    key,\n'
+        '):\n'
+        '    return key\n'
+        '\n'
+        'after = 1\n'
+    )
+
+    result = extract_symbol(str(path), "lookup")
+    assert result == '@cache\n@trace(level=2)\ndef lookup(\n    key,\n):\n    return key'
+
+    path = tmp_path / "broken.py"
+    path.write_text(
+        'def broken(:\n'
+        '    pass\n'
+        '\n'
+        'def fine():\n'
+        '    return 1\n'
+    )
+
+    assert extract_symbol(str(path), "fine") == 'def fine():\n    return 1\n'
+
+
+@pytest.fixture
+def fake_tree(monkeypatch):
+    """Serve walk_repo's filesystem fallback from a nested dict instead of disk."""
+    import code_explainer.git_utils as git_utils
+
+    def install(tree):
+        def walk(top):
+            # Top-down like os.walk, honouring in-place pruning of dirnames
+            stack = [(top, tree)]
+            while stack:
+                path, node = stack.pop()
+                dirnames = [name for name, child in node.items() if child is not None]
+                filenames = [name for name, child in node.items() if child is None]
+                yield path, dirnames, filenames
+                stack.extend((f"{path}/{name}", node[name]) for name in reversed(dirnames))
+
+        monkeypatch.setattr(os, "walk", walk)
+
+    monkeypatch.setattr(git_utils, "_list_tracked_files", lambda path: None)
+    walk_repo.cache_clear()
+    yield install
+    walk_repo.cache_clear()
+
+
+def test_get_repo_structure(fake_tree):
     """Test directory tree generation."""
-    with tempfile.TemporaryDirectory() as tmpdir:
-        # Create some structure
-        os.makedirs(os.path.join(tmpdir, "src", "pkg"))
-        with open(os.path.join(tmpdir, "src", "pkg", "main.py"), "w") as f:
-            f.write("print('hello')")
-        with open(os.path.join(tmpdir, "README.md"), "w") as f:
-            f.write("# Hello")
+    fake_tree({"src": {"pkg": {"main.py": None}}, "README.md": None})
 
-        tree = get_repo_structure(tmpdir, max_depth=3)
-        assert "src" in tree
-        assert "main.py" in tree
-        assert "README.md" in tree
+    tree = get_repo_structure("/fake", max_depth=3)
+    assert "src" in tree
+    assert "main.py" in tree
+    assert "README.md" in tree
 
 
-def test_get_repo_structure_skips_hidden():
+def test_get_repo_structure_skips_hidden(fake_tree):
     """Test that .git and __pycache__ are filtered."""
-    with tempfile.TemporaryDirectory() as tmpdir:
-        os.makedirs(os.path.join(tmpdir, ".git", "objects"))
-        os.makedirs(os.path.join(tmpdir, "__pycache__"))
-        os.makedirs(os.path.join(tmpdir, "src"))
-        with open(os.path.join(tmpdir, "src", "app.py"), "w") as f:
-            f.write("")
-
-        tree = get_repo_structure(tmpdir)
-        assert ".git" not in tree
-        assert "__pycache__" not in tree
-        assert "src" in tree
+    fake_tree({".git": {"objects": {}}, "__pycache__": {}, "src": {"app.py": None}})
+
+    tree = get_repo_structure("/fake")
+    assert ".git" not in tree
+    assert "__pycache__" not in tree
+    assert "src" in tree
+
+
+def test_walk_repo_uses_git_file_list(tmp_path):
+    """Inside a git work tree, ignored files are left out of the tree."""
+    tmpdir = str(tmp_path)
+    subprocess.run(["git", "init", "-q", tmpdir], check=True)
+    os.makedirs(os.path.join(tmpdir, "src", "pkg", "deep"))
+    os.makedirs(os.path.join(tmpdir, "logs"))
+    files = {
+        ".gitignore": "logs/\n",
+        "src/pkg/main.py": "",
+        "src/pkg/deep/inner.py": "",
+        "logs/run.log": "",
+    }
+    for rel, content in files.items():
+        Path(tmpdir, rel).write_text(content)
+
+    tree, repo_files = walk_repo(tmpdir, max_depth=3)
+    assert "logs" not in tree
+    assert "inner.py" not in tree
+    assert "├── src\n│   └── pkg\n│       ├── deep\n│       └── main.py" in tree
+    assert repo_files == {".gitignore", "src/pkg/main.py"}
+
+
+def test_walk_repo_inside_ignored_dir(tmp_path):
+    """A directory git ignores entirely is walked instead of coming back empty."""
+    subprocess.run(["git", "init", "-q", str(tmp_path)], check=True)
+    lib = tmp_path / "vendor" / "lib"
+    lib.mkdir(parents=True)
+    (tmp_path / ".gitignore").write_text("vendor/\n")
+    (lib / "core.py").write_text("import helpers\n")
+    (lib / "helpers.py").write_text("")
+
+    tree, repo_files = walk_repo(str(lib))
+    assert repo_files == {"core.py", "helpers.py"}
+    assert "core.py" in tree
+
+    result = get_imports(str(lib / "helpers.py"), str(lib))
+    assert result["imported_by"] == ["core.py"]
+
+
+def test_get_diff_truncates_large_diffs(tmp_path):
+    """Diffs past max_bytes are cut at a line boundary and marked."""
+    tmpdir = str(tmp_path)
+    subprocess.run(["git", "init", "-q", tmpdir], check=True)
+    Path(tmpdir, "big.txt").write_text("".join(f"line {i}\n" for i in range(1000)))
+    subprocess.run(["git", "add", "big.txt"], cwd=tmpdir, check=True)
+
+    full = get_diff(cwd=tmpdir)
+    assert "+line 999\n" in full
+    assert "truncated" not in full
+
+    cut = get_diff(cwd=tmpdir, max_bytes=500)
+    body, marker = cut.rsplit("\n[", 1)
+    assert marker == "diff truncated at 500 bytes]\n"
+    assert full.startswith(body)
+    assert body.endswith("\n")
+
+    assert "big.txt" in get_diff_stat(cwd=tmpdir)
+
+
+def test_run_capped_drains_stderr():
+    """A command that fills the stderr pipe before writing stdout doesn't deadlock."""
+    script = "import sys; sys.stderr.write('e' * 200_000); sys.stderr.flush(); print('out')"
+    returncode, stdout, stderr, truncated = _run_capped([sys.executable, "-c", script], None, 100)
+    assert (returncode, stdout, len(stderr), truncated) == (0, b"out\n", 200_000, False)
+
+
+def test_diff_max_bytes_fits_model_limit():
+    """A diff cut at the model's cap still yields a prompt within its limit."""
+    limit = MODEL_LIMITS["claude"]
+    cap = _diff_max_bytes("claude")
+    # Worst case for the changed-files summary: nothing but file headers
+    headers = "".join(f"diff --git a/f{i} b/f{i}\n--- a/f{i}\n+++ b/f{i}\n" for i in range(cap // 30))
+    diff = headers[:cap]
+    commit_log = "".join(f"{i:07x} {'x' * 150}\n" for i in range(20))
+
+    prompt = build_diff_prompt(diff, commit_log, _changed_files(diff))
+    assert len(prompt.encode()) <= limit
+
+
+def test_get_file_content_cache_invalidates_on_change(tmp_path):
+    """Cached file content is refreshed when the file's mtime changes."""
+    tmpdir = str(tmp_path)
+    path = os.path.join(tmpdir, "notes.txt")
+    Path(path).write_text("first")
+    os.utime(path, ns=(1_000_000_000, 1_000_000_000))
+    assert get_file_content(path) == "first"
+
+    Path(path).write_text("second")
+    os.utime(path, ns=(2_000_000_000, 2_000_000_000))
+    assert get_file_content(path) == "second"
+
+    assert get_file_content(os.path.join(tmpdir, "missing.txt")) is None
+    assert get_file_content(tmpdir) is None
+
+    latin1 = os.path.join(tmpdir, "latin1.txt")
+    Path(latin1).write_bytes(b"caf\xe9 ok")
+    assert get_file_content(latin1) == "caf\ufffd ok"
+
+
+def test_get_imports_imported_by(tmp_path):
+    """Importers are found from parsed import statements, not substring matches."""
+    tmpdir = str(tmp_path)
+    files = {
+        "src/pkg/__init__.py": "",
+        "src/pkg/parser.py": "import os\n",
+        "src/pkg/cli.py": "from .parser import parse\n",
+        "src/pkg/app.py": "import pkg.parser as p\n",
+        "src/pkg/notes.py": "# the parser lives next door\nimport json\n",
+        # Too deeply nested for the parser; left out of the index
+        "src/pkg/generated.py": "import pkg.parser\nx = 1" + " + 1" * 200_000 + "\n",
+        "src/pkg/sub/__init__.py": "",
+        "src/pkg/sub/mod.py": "",
+        "src/pkg/deep.py": "from pkg.sub.mod import x\n",
+        "src/pkg/direct.py": "import pkg.sub.mod\n",
+    }
+    for rel, content in files.items():
+        path = os.path.join(tmpdir, rel)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        Path(path).write_text(content)
+
+    result = get_imports(os.path.join(tmpdir, "src/pkg/parser.py"), tmpdir)
+    assert result["imports"] == ["import os"]
+    assert sorted(result["imported_by"]) == [
+        os.path.join("src", "pkg", "app.py"),
+        os.path.join("src", "pkg", "cli.py"),
+    ]
+
+    # Importing a submodule also imports its parent packages
+    result = get_imports(os.path.join(tmpdir, "src/pkg/sub/__init__.py"), tmpdir)
+    assert sorted(result["imported_by"]) == [
+        os.path.join("src", "pkg", "deep.py"),
+        os.path.join("src", "pkg", "direct.py"),
+    ]
+
+
+def test_get_imports_builds_index_once(tmp_path, monkeypatch):
+    """Concurrent lookups share a single build of the import index."""
+    import ast
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+
+    for i in range(10):
+        (tmp_path / f"m{i}.py").write_text("import os\n")
+    parsed = []
+    parse = ast.parse
+
+    def slow_parse(source, *args, **kwargs):
+        # Slow enough that unsynchronized callers would overlap and each build
+        parsed.append(source)
+        time.sleep(0.01)
+        return parse(source, *args, **kwargs)
+
+    monkeypatch.setattr(ast, "parse", slow_parse)
+
+    with ThreadPoolExecutor(4) as pool:
+        list(pool.map(lambda i: get_imports(str(tmp_path / f"m{i}.py"), str(tmp_path)), range(4)))
+    assert len(parsed) == 10
+
+
+def test_find_related_tests(tmp_path):
+    """Related tests are found by name under either convention, skipping ignored dirs."""
+    tmpdir = str(tmp_path)
+    files = {
+        "tests/test_parser.py": "",
+        "tests/lexer_test.py": "",
+        "tests/api_test.py": "tokenize()\n",
+        "tests/test_other.py": "from app import tokenize\n",
+        "tests/test_unrelated.py": "",
+        ".venv/test_parser.py": "",
+    }
+    for rel, content in files.items():
+        path = os.path.join(tmpdir, rel)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        Path(path).write_text(content)
+
+    assert sorted(find_related_tests("src/parser.py", tmpdir)) == [
+        os.path.join("tests", "test_parser.py"),
+    ]
+    assert find_related_tests("src/lexer.py", tmpdir) == [os.path.join("tests", "lexer_test.py")]
+    assert sorted(find_related_tests("src/app.py", tmpdir, "tokenize")) == [
+        os.path.join("tests", "api_test.py"),
+        os.path.join("tests", "test_other.py"),
+    ]
+
+
+def test_find_related_tests_parallel(tmp_path):
+    """Large scans give the same results, in order, through the thread pool."""
+    tmpdir = str(tmp_path)
+    for i in range(60):
+        Path(tmpdir, f"test_mod{i:02d}.py").write_text("use(tokenize)\n" if i % 20 == 0 else "")
+
+    related = find_related_tests("src/app.py", tmpdir, "tokenize")
+    assert sorted(related) == ["test_mod00.py", "test_mod20.py", "test_mod40.py"]
 
 
 def test_find_project_config():
     """Test project config detection."""
-    with tempfile.TemporaryDirectory() as tmpdir:
-        with open(os.path.join(tmpdir, "pyproject.toml"), "w") as f:
-            f.write('[project]\nname = "test"\n')
-
-        name, content = _find_project_config(tmpdir)
-        assert name == "pyproject.toml"
-        assert "test" in content
-
-
-def test_function_requires_colon():
+    files = {"/fake/pyproject.toml": '[project]\nname = "test"\n'}
+
+    name, content = _find_project_config(
+        "/fake",
+        lister=lambda path: {os.path.basename(f) for f in files},
+        reader=files.get,
+    )
+    assert name == "pyproject.toml"
+    assert "test" in content
+
+
+def test_find_entry_points(tmp_path):
+    """Entry points come from conventional files and [project.scripts]."""
+    tmpdir = str(tmp_path)
+    Path(tmpdir, "main.py").write_text("")
+    config = (
+        '[project]\nname = "test"\n\n'
+        '[project.scripts]\n'
+        '# comment\n'
+        'explain = "code_explainer.cli:cli"\n'
+        '"other-tool" = "pkg.other:main"\n\n'
+        '[build-system]\nrequires = ["hatchling"]\n'
+    )
+
+    entry_points = _find_entry_points(tmpdir, config)
+    assert entry_points == [
+        "main.py",
+        'explain = "code_explainer.cli:cli"',
+        'other-tool = "pkg.other:main"',
+    ]
+
+    # Same answer when candidates are looked up in a walked file set
+    _, repo_files = walk_repo(tmpdir)
+    assert _find_entry_points(tmpdir, config, repo_files) == entry_points
+
+
+def test_function_requires_colon(runner):
     """Function command requires FILE:SYMBOL format."""
-    runner = CliRunner()
     result = runner.invoke(cli, ["function", "nocolon"])
     assert result.exit_code != 0
     assert "FILE_PATH:SYMBOL_NAME" in result.output
 
 
+def test_explain_cache_hit(tmp_path, monkeypatch):
+    """A cached response is returned without invoking the model CLI."""
+    tmpdir = str(tmp_path)
+    monkeypatch.setenv("XDG_CACHE_HOME", tmpdir)
+    monkeypatch.setenv("CODE_EXPLAINER_CACHE", "1")
+    # Make sure the real model can't be reached
+    monkeypatch.setenv("PATH", tmpdir)
+
+    path = _cache_path("Explain this", "claude")
+    os.makedirs(os.path.dirname(path))
+    Path(path).write_bytes(b"cached answer")
+
+    chunks = []
+    result = asyncio.run(explain("Explain this", "claude", on_chunk=chunks.append))
+    assert result == b"cached answer"
+    assert chunks == [b"cached answer"]
+
+    monkeypatch.delenv("CODE_EXPLAINER_CACHE")
+    assert _cache_path("Explain this", "claude") is None
+
+
+def test_explain_rejects_oversize_prompt(monkeypatch):
+    """Prompts over the model's size limit fail before the CLI is spawned."""
+    monkeypatch.setenv("PATH", "")
+    prompt = "x" * (MODEL_LIMITS["claude"] + 1)
+    with pytest.raises(ValueError, match="limit"):
+        asyncio.run(explain(prompt, "claude"))
+
+
 # --- Topics queue tests ---
 
 
-def test_parse_topics_from_response():
-    """Parse structured topics from model output."""
-    response = """
+TOPICS_RESPONSE = """
 # Explanation
 
 Here is the explanation of the file.
@@ -215,250 +494,414 @@ Here is the explanation of the file.
 - [function] `src/router.py:route_request` — Decides which agent handles each request
 - [general] `error-handling-strategy` — How failures propagate across agent boundaries
 """
-    topics = parse_topics_from_response(response, source="test")
-    assert len(topics) == 3
 
-    assert topics[0].kind == "file"
-    assert topics[0].target == "src/workflow/executor.py"
-    assert "plan-execute-synthesize" in topics[0].title
-    assert topics[0].source == "test"
-
-    assert topics[1].kind == "function"
-    assert topics[1].target == "src/router.py:route_request"
-
-    assert topics[2].kind == "general"
-    assert topics[2].target == "error-handling-strategy"
-
-
-def test_parse_topics_no_section():
-    """No topics section means empty list."""
-    response = "Just a plain explanation with no topics section."
-    topics = parse_topics_from_response(response)
-    assert topics == []
 
+@pytest.mark.parametrize(
+    "response,expected",
+    [
+        (
+            TOPICS_RESPONSE,
+            [
+                ("file", "src/workflow/executor.py"),
+                ("function", "src/router.py:route_request"),
+                ("general", "error-handling-strategy"),
+            ],
+        ),
+        # No topics section means empty list
+        ("Just a plain explanation with no topics section.", []),
+        # Handles 'Topic to Explore' (singular) header
+        ("\n## Topic to Explore\n\n- [file] `main.py` — Entry point\n", [("file", "main.py")]),
+    ],
+    ids=["full", "no-section", "singular-header"],
+)
+def test_parse_topics(response, expected):
+    """Parse structured topics from model output."""
+    topics = parse_topics_from_response(response, source="test")
+    assert [(t.kind, t.target) for t in topics] == expected
 
-def test_parse_topics_alternate_header():
-    """Handles 'Topic to Explore' (singular) header."""
-    response = """
-## Topic to Explore
 
-- [file] `main.py` — Entry point
-"""
-    topics = parse_topics_from_response(response)
-    assert len(topics) == 1
-    assert topics[0].target == "main.py"
+def test_parse_topics_title_and_source():
+    """Parsed topics carry their description and source."""
+    topics = parse_topics_from_response(TOPICS_RESPONSE, source="test")
+    assert "plan-execute-synthesize" in topics[0].title
+    assert topics[0].source == "test"
 
 
-def test_queue_save_load():
+def test_queue_save_load(queue_dir):
     """Queue round-trips through JSON."""
-    with tempfile.TemporaryDirectory() as tmpdir:
-        queue = [
-            Topic(title="Test topic", kind="file", target="src/main.py"),
-            Topic(title="Another", kind="function", target="src/app.py:run"),
-        ]
-        save_queue(tmpdir, queue)
-
-        loaded = load_queue(tmpdir)
-        assert len(loaded) == 2
-        assert loaded[0].title == "Test topic"
-        assert loaded[0].kind == "file"
-        assert loaded[1].target == "src/app.py:run"
+    loaded = load_queue(queue_dir)
+    assert len(loaded) == 3
+    assert loaded[0].title == "Executor module"
+    assert loaded[0].kind == "file"
+    assert loaded[0].source == "repo-overview"
+    assert loaded[1].target == "src/router.py:route"
+
+
+def test_queue_cache_tracks_file(tmp_path):
+    """Loaded queues are independent copies and pick up outside edits."""
+    tmpdir = str(tmp_path)
+    save_queue(tmpdir, [Topic(title="One", kind="file", target="a.py")])
+
+    loaded = load_queue(tmpdir)
+    loaded[0].status = "done"
+    assert load_queue(tmpdir)[0].status == "pending"
+    assert pending_count(tmpdir) == 1
+
+    path = os.path.join(tmpdir, "topics.json")
+    with open(path, "w") as f:
+        json.dump([{"title": "Two", "kind": "file", "target": "b.py"}], f)
+    os.utime(path, ns=(1_000_000_000, 1_000_000_000))
+    assert [t.target for t in load_queue(tmpdir)] == ["b.py"]
+
+    os.unlink(path)
+    assert load_queue(tmpdir) == []
+
+
+def test_add_topics_after_outside_edit(tmp_path):
+    """Deduplication follows the queue file, not a stale in-memory index."""
+    tmpdir = str(tmp_path)
+    assert add_topics(tmpdir, [Topic(title="A", kind="file", target="a.py")]) == 1
+    assert add_topics(tmpdir, [Topic(title="A", kind="file", target="a.py")]) == 0
+
+    save_queue(tmpdir, [])
+    assert add_topics(tmpdir, [Topic(title="A", kind="file", target="a.py")]) == 1
+    assert [t.target for t in load_queue(tmpdir)] == ["a.py"]
+
+
+@pytest.mark.parametrize(
+    "operation,expected",
+    [
+        (load_queue, []),
+        (pending_count, 0),
+        (pop_next, None),
+        (lambda d: pop_batch(d, 3), []),
+        (lambda d: pop_at(d, 0), None),
+        (lambda d: skip_topic(d, 0), False),
+    ],
+    ids=["load", "pending", "pop-next", "pop-batch", "pop-at", "skip"],
+)
+def test_empty_queue(tmp_path, operation, expected):
+    """Every queue operation behind topics/next/pick handles a dir with no queue."""
+    assert operation(str(tmp_path)) == expected
 
 
-def test_queue_empty_dir():
-    """Loading from empty dir returns empty list."""
-    with tempfile.TemporaryDirectory() as tmpdir:
-        assert load_queue(tmpdir) == []
+def test_topic_from_tuple():
+    """Topics build from positional tuples and carry no per-instance dict."""
+    topic = Topic.from_tuple(("Router logic", "function", "src/router.py:route", "repo-overview"))
+    assert (topic.title, topic.kind, topic.target, topic.source) == (
+        "Router logic", "function", "src/router.py:route", "repo-overview",
+    )
+    assert topic.status == "pending"
+    assert not hasattr(topic, "__dict__")
 
 
-def test_add_topics_deduplicates():
+def test_add_topics_deduplicates(tmp_path):
     """Adding topics skips duplicates by target."""
-    with tempfile.TemporaryDirectory() as tmpdir:
-        t1 = Topic(title="First", kind="file", target="src/a.py")
-        t2 = Topic(title="Second", kind="file", target="src/b.py")
-        t3 = Topic(title="Duplicate", kind="file", target="src/a.py")
+    tmpdir = str(tmp_path)
+    t1, t2, t3 = [Topic.from_tuple(t) for t in [
+        ("First", "file", "src/a.py"),
+        ("Second", "file", "src/b.py"),
+        ("Duplicate", "file", "src/a.py"),
+    ]]
 
-        added = add_topics(tmpdir, [t1, t2])
-        assert added == 2
+    added = add_topics(tmpdir, [t1, t2])
+    assert added == 2
 
-        added = add_topics(tmpdir, [t3])
-        assert added == 0
+    added = add_topics(tmpdir, [t3])
+    assert added == 0
 
-        queue = load_queue(tmpdir)
-        assert len(queue) == 2
+    queue = load_queue(tmpdir)
+    assert len(queue) == 2
 
 
-def test_pop_next():
+def test_pop_next(queue_dir):
     """Pop returns first pending and marks it done."""
-    with tempfile.TemporaryDirectory() as tmpdir:
-        topics = [
-            Topic(title="First", kind="file", target="a.py"),
-            Topic(title="Second", kind="file", target="b.py"),
-        ]
-        save_queue(tmpdir, topics)
+    topic = pop_next(queue_dir)
+    assert topic is not None
+    assert topic.target == "src/executor.py"
+    assert topic.status == "done"
 
-        topic = pop_next(tmpdir)
-        assert topic is not None
-        assert topic.target == "a.py"
-        assert topic.status == "done"
+    # Queue on disk should reflect the change
+    queue = load_queue(queue_dir)
+    assert queue[0].status == "done"
+    assert queue[1].status == "pending"
 
-        # Queue on disk should reflect the change
-        queue = load_queue(tmpdir)
-        assert queue[0].status == "done"
-        assert queue[1].status == "pending"
+    # Pop again gets second
+    topic2 = pop_next(queue_dir)
+    assert topic2.target == "src/router.py:route"
 
-        # Pop again gets second
-        topic2 = pop_next(tmpdir)
-        assert topic2.target == "b.py"
+    assert pop_next(queue_dir).target == "architecture"
 
-        # Pop on empty returns None
-        assert pop_next(tmpdir) is None
+    # Pop on empty returns None
+    assert pop_next(queue_dir) is None
 
 
-def test_skip_topic():
+def test_skip_topic(queue_dir):
     """Skip marks a pending topic as skipped."""
-    with tempfile.TemporaryDirectory() as tmpdir:
-        topics = [
-            Topic(title="First", kind="file", target="a.py"),
-            Topic(title="Second", kind="file", target="b.py"),
-            Topic(title="Third", kind="file", target="c.py"),
-        ]
-        save_queue(tmpdir, topics)
+    # Skip first pending (index 0)
+    assert skip_topic(queue_dir, 0) is True
 
-        # Skip first pending (index 0)
-        assert skip_topic(tmpdir, 0) is True
+    queue = load_queue(queue_dir)
+    assert queue[0].status == "skipped"
+    assert queue[1].status == "pending"
 
-        queue = load_queue(tmpdir)
-        assert queue[0].status == "skipped"
-        assert queue[1].status == "pending"
+    # Pending count should be 2
+    assert pending_count(queue_dir) == 2
 
-        # Pending count should be 2
-        assert pending_count(tmpdir) == 2
 
+def test_pending_count(queue_dir):
+    assert pending_count(queue_dir) == 3
 
-def test_pending_count():
-    with tempfile.TemporaryDirectory() as tmpdir:
-        assert pending_count(tmpdir) == 0
+    pop_next(queue_dir)
+    assert pending_count(queue_dir) == 2
 
-        topics = [
-            Topic(title="A", kind="file", target="a.py"),
-            Topic(title="B", kind="file", target="b.py", status="done"),
-        ]
-        save_queue(tmpdir, topics)
-        assert pending_count(tmpdir) == 1
 
-
-def test_topics_subcommand_empty():
-    """Topics command shows message when queue is empty."""
-    runner = CliRunner()
-    with tempfile.TemporaryDirectory() as tmpdir:
-        result = runner.invoke(cli, ["topics", "-d", tmpdir])
-        assert result.exit_code == 0
-        assert "No topics queued" in result.output
+def test_topics_subcommand_with_items(runner, queue_dir):
+    """Topics command lists pending items."""
+    result = runner.invoke(cli, ["topics", "-d", queue_dir])
+    assert result.exit_code == 0
+    assert "src/executor.py" in result.output
+    assert "src/router.py:route" in result.output
+    assert "3 pending" in result.output
 
 
-def test_topics_subcommand_with_items():
-    """Topics command lists pending items."""
-    with tempfile.TemporaryDirectory() as tmpdir:
-        topics = [
-            Topic(title="Executor module", kind="file", target="src/executor.py", source="repo-overview"),
-            Topic(title="Router logic", kind="function", target="src/router.py:route", source="repo-overview"),
-        ]
-        save_queue(tmpdir, topics)
-
-        runner = CliRunner()
-        result = runner.invoke(cli, ["topics", "-d", tmpdir])
-        assert result.exit_code == 0
-        assert "src/executor.py" in result.output
-        assert "src/router.py:route" in result.output
-        assert "2 pending" in result.output
-
-
-def test_next_subcommand_empty():
-    """Next command shows message when queue is empty."""
-    runner = CliRunner()
-    with tempfile.TemporaryDirectory() as tmpdir:
-        result = runner.invoke(cli, ["next", "-d", tmpdir])
-        assert result.exit_code == 0
-        assert "No pending topics" in result.output
-
-
-def test_next_skip():
+def test_next_skip(runner, queue_dir):
     """Next --skip marks the next topic as skipped."""
-    with tempfile.TemporaryDirectory() as tmpdir:
-        topics = [
-            Topic(title="First", kind="file", target="a.py"),
-            Topic(title="Second", kind="file", target="b.py"),
-        ]
-        save_queue(tmpdir, topics)
-
-        runner = CliRunner()
-        result = runner.invoke(cli, ["next", "--skip", "-d", tmpdir])
-        assert result.exit_code == 0
-        assert "Skipped" in result.output
+    result = runner.invoke(cli, ["next", "--skip", "-d", queue_dir])
+    assert result.exit_code == 0
+    assert "Skipped" in result.output
 
-        queue = load_queue(tmpdir)
-        assert queue[0].status == "skipped"
-        assert queue[1].status == "pending"
+    queue = load_queue(queue_dir)
+    assert queue[0].status == "skipped"
+    assert queue[1].status == "pending"
 
 
-def test_pop_at():
+def test_pop_at(queue_dir):
     """Pop at index selects a specific pending topic."""
-    with tempfile.TemporaryDirectory() as tmpdir:
-        topics = [
-            Topic(title="First", kind="file", target="a.py"),
-            Topic(title="Second", kind="function", target="b.py:run"),
-            Topic(title="Third", kind="general", target="architecture"),
-        ]
-        save_queue(tmpdir, topics)
-
-        # Pick the second topic (index 1)
-        topic = pop_at(tmpdir, 1)
-        assert topic is not None
-        assert topic.target == "b.py:run"
-        assert topic.status == "done"
-
-        # Queue should have first and third still pending
-        queue = load_queue(tmpdir)
-        assert queue[0].status == "pending"
-        assert queue[1].status == "done"
-        assert queue[2].status == "pending"
-
-        # Out of bounds returns None
-        assert pop_at(tmpdir, 5) is None
-        assert pop_at(tmpdir, -1) is None
-
-
-def test_pick_help():
-    """Pick command shows help."""
-    runner = CliRunner()
-    result = runner.invoke(cli, ["pick", "--help"])
+    # Pick the second topic (index 1)
+    topic = pop_at(queue_dir, 1)
+    assert topic is not None
+    assert topic.target == "src/router.py:route"
+    assert topic.status == "done"
+
+    # Queue should have first and third still pending
+    queue = load_queue(queue_dir)
+    assert queue[0].status == "pending"
+    assert queue[1].status == "done"
+    assert queue[2].status == "pending"
+
+    # Out of bounds returns None
+    assert pop_at(queue_dir, 5) is None
+    assert pop_at(queue_dir, -1) is None
+
+
+def test_pop_batch(tmp_path):
+    """Pop batch returns up to N pending topics and marks them done."""
+    tmpdir = str(tmp_path)
+    topics = [
+        Topic(title="First", kind="file", target="a.py"),
+        Topic(title="Second", kind="file", target="b.py", status="skipped"),
+        Topic(title="Third", kind="file", target="c.py"),
+        Topic(title="Fourth", kind="file", target="d.py"),
+    ]
+    save_queue(tmpdir, topics)
+
+    batch = pop_batch(tmpdir, 2)
+    assert [t.target for t in batch] == ["a.py", "c.py"]
+    assert all(t.status == "done" for t in batch)
+    assert pending_count(tmpdir) == 1
+
+    assert [t.target for t in pop_batch(tmpdir, 5)] == ["d.py"]
+    assert pop_batch(tmpdir, 5) == []
+
+
+def test_record_output(tmp_path):
+    """Record output marks every matching topic done with the same path."""
+    tmpdir = str(tmp_path)
+    topics = [
+        Topic(title="First", kind="file", target="a.py", status="done"),
+        Topic(title="Again", kind="file", target="a.py"),
+        Topic(title="Skipped", kind="file", target="a.py", status="skipped"),
+        Topic(title="Symbol", kind="function", target="a.py"),
+    ]
+    save_queue(tmpdir, topics)
+
+    assert record_output(tmpdir, "file", "a.py", "out/a.md") == 2
+    queue = load_queue(tmpdir)
+    assert [t.status for t in queue] == ["done", "done", "skipped", "pending"]
+    assert [t.output for t in queue] == ["out/a.md", "out/a.md", "", ""]
+
+
+def test_pick_no_index_lists_topics(runner, queue_dir):
+    """Pick with no index lists pending topics."""
+    result = runner.invoke(cli, ["pick", "-d", queue_dir])
     assert result.exit_code == 0
-    assert "Pick a topic" in result.output
+    assert "0." in result.output
+    assert "1." in result.output
+    assert "src/executor.py" in result.output
+    assert "src/router.py:route" in result.output
+
+
+# Stand-in model CLI: answers in two flushed halves tagged with its pid, so
+# interleaved writers are visible, and lists one follow-up topic.
+# FAKE_MODEL_FAIL fails prompts containing that text; FAKE_MODEL_SLEEP
+# pauses between the halves.
+FAKE_MODEL = """\
+import os, sys, time
+prompt = sys.stdin.read()
+fail = os.environ.get("FAKE_MODEL_FAIL")
+if fail and fail in prompt:
+    sys.exit("model failed")
+print(f"# Explanation from {os.getpid()}", flush=True)
+time.sleep(float(os.environ.get("FAKE_MODEL_SLEEP", "0")))
+print(f"End of {os.getpid()}")
+print()
+print("## Topics to Explore")
+print()
+print("- [file] `discovered.py` \u2014 Found while explaining")
+"""
 
 
-def test_pick_no_index_lists_topics():
-    """Pick with no index lists pending topics."""
-    with tempfile.TemporaryDirectory() as tmpdir:
-        topics = [
-            Topic(title="Executor module", kind="file", target="src/executor.py"),
-            Topic(title="Router logic", kind="function", target="src/router.py:route"),
-        ]
-        save_queue(tmpdir, topics)
-
-        runner = CliRunner()
-        result = runner.invoke(cli, ["pick", "-d", tmpdir])
-        assert result.exit_code == 0
-        assert "0." in result.output
-        assert "1." in result.output
-        assert "src/executor.py" in result.output
-        assert "src/router.py:route" in result.output
-
-
-def test_pick_empty_queue():
-    """Pick with empty queue shows message."""
-    runner = CliRunner()
-    with tempfile.TemporaryDirectory() as tmpdir:
-        result = runner.invoke(cli, ["pick", "-d", tmpdir])
-        assert result.exit_code == 0
-        assert "No pending topics" in result.output
+@pytest.fixture
+def fake_model(tmp_path_factory, monkeypatch):
+    """Point the claude model at a local fake CLI for the duration of a test."""
+    script = tmp_path_factory.mktemp("model") / "fake_model.py"
+    script.write_text(FAKE_MODEL)
+    monkeypatch.setitem(MODEL_COMMANDS, "claude", [sys.executable, str(script)])
+    check_model_available.cache_clear()
+    yield
+    check_model_available.cache_clear()
+
+
+@pytest.fixture
+def batch_repo(tmp_path):
+    """A repo of three small files and an output dir queueing each as a file topic."""
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    for name in ("a", "b", "c"):
+        (repo / f"{name}.py").write_text(f"{name.upper()} = 1\n")
+    out = tmp_path / "out"
+    save_queue(str(out), [Topic(title=f"File {t}", kind="file", target=t) for t in ("a.py", "b.py", "c.py")])
+    return repo, out
+
+
+def test_next_batch(runner, batch_repo, fake_model):
+    """A batch streams each answer to its file, records it, and queues follow-ups once."""
+    repo, out = batch_repo
+
+    result = runner.invoke(cli, ["-q", "next", "-n", "3", "-j", "3", "-d", str(out), "-r", str(repo)])
+    assert result.exit_code == 0, result.output
+
+    for name in ("a", "b", "c"):
+        assert (out / f"{name}.md").read_text().startswith("# Explanation from ")
+    queue = load_queue(str(out))
+    assert [(t.target, t.status, t.output) for t in queue] == [
+        ("a.py", "done", str(out / "a.md")),
+        ("b.py", "done", str(out / "b.md")),
+        ("c.py", "done", str(out / "c.md")),
+        # Every answer suggests it; it is queued once
+        ("discovered.py", "pending", ""),
+    ]
+
+
+def test_next_batch_failure(runner, batch_repo, fake_model, monkeypatch):
+    """A failed model run fails the batch and goes back to pending; the rest finish."""
+    repo, out = batch_repo
+    monkeypatch.setenv("FAKE_MODEL_FAIL", "B = 1")
+
+    result = runner.invoke(cli, ["-q", "next", "-n", "3", "-d", str(out), "-r", str(repo)])
+    assert result.exit_code == 1
+    assert "Error explaining b.py: Model claude failed: model failed" in result.output
+
+    assert not (out / "b.md").exists()
+    assert not list(out.glob("*.part"))
+    statuses = {t.target: t.status for t in load_queue(str(out))}
+    assert statuses == {"a.py": "done", "b.py": "pending", "c.py": "done", "discovered.py": "pending"}
+
+
+def test_next_batch_bad_topic_stays_done(runner, batch_repo, fake_model):
+    """A topic that would fail again is reported and not requeued."""
+    repo, out = batch_repo
+    save_queue(str(out), [
+        Topic(title="Mystery", kind="unknown", target="a.py"),
+        Topic(title="File b.py", kind="file", target="b.py"),
+    ])
+
+    result = runner.invoke(cli, ["-q", "next", "-n", "2", "-d", str(out), "-r", str(repo)])
+    assert result.exit_code == 1
+    assert "Error explaining a.py: Unknown topic kind: unknown" in result.output
+
+    statuses = {t.target: t.status for t in load_queue(str(out))}
+    assert statuses == {"a.py": "done", "b.py": "done", "discovered.py": "pending"}
+
+
+def test_next_batch_oversize_prompt_stays_done(runner, batch_repo, fake_model, monkeypatch):
+    """A prompt over the model's limit is reported once instead of requeued forever."""
+    repo, out = batch_repo
+    (repo / "b.py").write_text("B = 1\n" * 2000)
+    monkeypatch.setitem(MODEL_LIMITS, "claude", 8000)
+
+    result = runner.invoke(cli, ["-q", "next", "-n", "3", "-d", str(out), "-r", str(repo)])
+    assert result.exit_code == 1
+    assert "Error explaining b.py: Prompt is" in result.output
+
+    assert not (out / "b.md").exists()
+    statuses = {t.target: t.status for t in load_queue(str(out))}
+    assert statuses == {"a.py": "done", "b.py": "done", "c.py": "done", "discovered.py": "pending"}
+
+
+def test_next_batch_shared_output_path(runner, tmp_path, fake_model, monkeypatch):
+    """Topics that save to the same file take turns instead of clobbering each other."""
+    monkeypatch.setenv("FAKE_MODEL_SLEEP", "0.2")
+    out = tmp_path / "out"
+    save_queue(str(out), [
+        Topic(title="Overview", kind="repo", target="."),
+        Topic(title="Subdir overview", kind="repo", target="missing-subdir"),
+    ])
+
+    result = runner.invoke(cli, ["-q", "next", "-n", "2", "-d", str(out), "-r", str(tmp_path)])
+    assert result.exit_code == 0, result.output
+
+    lines = (out / "repo-overview.md").read_text().splitlines()
+    pid = lines[0].rsplit(" ", 1)[1]
+    assert lines[1] == f"End of {pid}"
+    assert not list(out.glob("*.part"))
+
+
+def test_output_dir_created_per_invocation(runner, tmp_path, fake_model, monkeypatch):
+    """Each command creates its relative output dir, whatever earlier runs created."""
+    for name in ("first", "second"):
+        workdir = tmp_path / name
+        workdir.mkdir()
+        (workdir / "m.py").write_text("x = 1\n")
+        monkeypatch.chdir(workdir)
+        result = runner.invoke(cli, ["-q", "file", "m.py"])
+        assert result.exit_code == 0, result.output
+        assert (workdir / "explanations" / "m.md").is_file()
+
+
+def test_next_batch_duplicates(runner, tmp_path, fake_model):
+    """Duplicate topics in a batch share one model call and its output."""
+    (tmp_path / "a.py").write_text("A = 1\n")
+    out = tmp_path / "out"
+    save_queue(str(out), [Topic(title=title, kind="file", target="a.py") for title in ("First", "Again")])
+
+    result = runner.invoke(cli, ["-q", "next", "-n", "2", "-d", str(out), "-r", str(tmp_path)])
+    assert result.exit_code == 0, result.output
+    assert "Skipping 1 duplicate topic(s)." in result.output
+    assert result.output.count("Running claude for a.py") == 1
+    assert [(t.status, t.output) for t in load_queue(str(out))][:2] == [("done", str(out / "a.md"))] * 2
+
+
+def test_requeue(tmp_path):
+    """Requeue resets popped topics without output and leaves finished ones alone."""
+    tmpdir = str(tmp_path)
+    save_queue(tmpdir, [
+        Topic(title="Popped", kind="file", target="a.py", status="done"),
+        Topic(title="Finished", kind="file", target="a.py", status="done", output="out/a.md"),
+        Topic(title="Skipped", kind="file", target="a.py", status="skipped"),
+        Topic(title="Other", kind="file", target="b.py", status="done"),
+    ])
+
+    assert requeue(tmpdir, "file", "a.py") == 1
+    assert [t.status for t in load_queue(tmpdir)] == ["pending", "done", "skipped", "done"]